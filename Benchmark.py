@@ -0,0 +1,223 @@
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from queue import Empty
+
+import numpy as np
+
+from InstanceGenerator import InstanceGenerator
+from algorithm.NonDominatedSort import NonDominatedSort
+from algorithm.Progress import ProgressObserver
+from model.Configuration import Configuration
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# Observes algorithm and records time when fitness of its best chromosome reaches thresholds
+# It is attached as migration of island model too, only to stop algorithm when time limit is exceeded
+class Recorder(ProgressObserver):
+    def __init__(self, thresholds, timeLimit):
+        super().__init__()
+        self._thresholds = sorted(thresholds)
+        self._timeLimit = timeLimit
+        # Number of fitness evaluations reported by algorithm
+        self.evaluations = 0
+        self.generations = 0
+        self.bestFitness = 0.0
+        # Seconds from start until best fitness has exceeded each threshold
+        self.timeToThreshold = {str(threshold): None for threshold in self._thresholds}
+
+    @property
+    # Returns TRUE when time limit is exceeded, so algorithm stops
+    def stopped(self):
+        return self.elapsed > self._timeLimit
+
+    # Chromosomes are not exchanged
+    def exchange(self, generation, population):
+        return []
+
+    # Called after replacement of each generation and when algorithm stops, with its best chromosome
+    def update(self, generation, fitness, objectives, evaluations, elapsed):
+        self.generations = generation
+        self.evaluations = evaluations
+        self.bestFitness = max(self.bestFitness, fitness)
+        for threshold in self._thresholds:
+            key = str(threshold)
+            if self.timeToThreshold[key] is None and self.bestFitness > threshold:
+                self.timeToThreshold[key] = round(elapsed, 4)
+
+
+def _runCase(algorithmName, fileName, minFitness, thresholds, timeLimit, results):
+    configuration = Configuration()
+    configuration.parseFile(fileName)
+    algorithm = getattr(importlib.import_module("algorithm." + algorithmName), algorithmName)
+
+    recorder = Recorder(thresholds + [minFitness], timeLimit)
+    alg = algorithm(configuration)
+    alg.migration = recorder
+    # progress of algorithm is not shown
+    alg.observer = recorder
+    alg.run(minFitness=minFitness)
+
+    elapsed = recorder.elapsed
+    peakRss = None
+    if resource is not None:
+        # kilobytes on Linux, bytes on macOS
+        peakRss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == "darwin":
+            peakRss //= 1024
+
+    results.put({"algorithm": algorithmName, "classes": configuration.numberOfCourseClasses,
+                 "wallTime": round(elapsed, 4), "evaluations": recorder.evaluations,
+                 "evaluationsPerSecond": round(recorder.evaluations / elapsed, 2) if elapsed > 0 else None,
+                 "generations": recorder.generations, "bestFitness": recorder.bestFitness,
+                 "timeToThreshold": recorder.timeToThreshold, "peakRssKb": peakRss})
+
+
+# Runs algorithms on instances of several sizes and compares results with saved baseline
+class Benchmark:
+    ALGORITHMS = ("GeneticAlgorithm", "NsgaII", "Ngra", "NsgaIII", "APNsgaIII", "Amga2", "Cso", "Fpa", "Dlba",
+                  "GaQpso")
+    THRESHOLDS = [0.9, 0.99]
+
+    def __init__(self, algorithms=ALGORITHMS, sizes=(0, 100, 300), minFitness=0.999, timeLimit=60, seed=1):
+        self._algorithms = algorithms
+        # Number of classes of each instance, 0 stands for GaSchedule.json
+        self._sizes = sizes
+        self._minFitness = minFitness
+        self._timeLimit = timeLimit
+        self._seed = seed
+
+    # Returns path to configuration file with given number of classes
+    def makeInstance(self, size, directory):
+        if size == 0:
+            return os.path.join(os.path.dirname(os.path.abspath(__file__)), "GaSchedule.json")
+
+        fileName = os.path.join(directory, "instance_{}.json".format(size))
+        rooms = max(3, size // 15)
+        generator = InstanceGenerator(numberOfProfessors=max(2, size // 4), numberOfGroups=max(2, size // 5),
+                                      numberOfRooms=rooms, numberOfLabs=max(1, rooms // 4), numberOfClasses=size,
+                                      seed=self._seed)
+        generator.write(fileName)
+        return fileName
+
+    # Runs each algorithm on each instance in separate process, so peak memory is measured for one run only
+    def run(self):
+        results = []
+        with tempfile.TemporaryDirectory() as directory:
+            for size in self._sizes:
+                fileName = self.makeInstance(size, directory)
+                for algorithmName in self._algorithms:
+                    queue = multiprocessing.Queue()
+                    process = multiprocessing.Process(target=_runCase, args=(algorithmName, fileName, self._minFitness,
+                                                                              self.THRESHOLDS, self._timeLimit, queue))
+                    process.start()
+                    # run which does not stop by itself is terminated
+                    deadline = time.perf_counter() + 2 * self._timeLimit + 60
+                    result = None
+                    while result is None:
+                        try:
+                            result = queue.get(timeout=1)
+                        except Empty:
+                            # run has failed?
+                            if not process.is_alive():
+                                break
+                            if time.perf_counter() > deadline:
+                                process.terminate()
+                                break
+                    process.join()
+                    if result is None:
+                        print(algorithmName, "has failed on", size, "classes")
+                        continue
+                    result["size"] = size
+                    results.append(result)
+                    print("{:<18} {:>6} classes {:>10.1f} evals/s {:>8.2f} s fitness {:f}".format(
+                        algorithmName, result["classes"], result["evaluationsPerSecond"] or 0, result["wallTime"],
+                        result["bestFitness"]))
+        return results
+
+    # Measures non-dominated sorting of populations of given sizes, parents and offspring are sorted together
+    @staticmethod
+    def sorting(populationSizes=(100, 500, 1000, 2000), numbersOfObjectives=(1, 5), repeat=3, seed=1):
+        rng = np.random.default_rng(seed)
+        results = []
+        for numberOfObjectives in numbersOfObjectives:
+            for populationSize in populationSizes:
+                # few distinct values, so there are ties and many fronts like in real populations
+                objectives = rng.integers(0, 30, (2 * populationSize, numberOfObjectives)).astype(float)
+                seconds = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    fronts = NonDominatedSort.fronts(objectives)
+                    seconds.append(time.perf_counter() - start)
+                results.append({"populationSize": populationSize, "objectives": numberOfObjectives,
+                                "fronts": len(fronts), "milliseconds": round(1000 * min(seconds), 3)})
+                print("{:>6} chromosomes {:>2} objectives {:>5} fronts {:>10.3f} ms".format(
+                    populationSize, numberOfObjectives, len(fronts), 1000 * min(seconds)))
+        return results
+
+    # Compares results with baseline, returns descriptions of runs which are slower than tolerance allows
+    @staticmethod
+    def compare(results, baseline, tolerance=0.1):
+        regressions = []
+        previous = {(result["algorithm"], result["size"]): result for result in baseline}
+        for result in results:
+            base = previous.get((result["algorithm"], result["size"]))
+            if base is None or not base["evaluationsPerSecond"] or not result["evaluationsPerSecond"]:
+                continue
+
+            ratio = result["evaluationsPerSecond"] / base["evaluationsPerSecond"]
+            print("{:<18} {:>6} classes evals/s {:>10.1f} -> {:>10.1f} ({:+.1%})".format(
+                result["algorithm"], result["classes"], base["evaluationsPerSecond"], result["evaluationsPerSecond"],
+                ratio - 1))
+            if ratio < 1 - tolerance:
+                regressions.append("{} on {} classes".format(result["algorithm"], result["classes"]))
+        return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures speed of algorithms on instances of several sizes.")
+    parser.add_argument("--algorithms", nargs="+", default=Benchmark.ALGORITHMS, choices=Benchmark.ALGORITHMS)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[0, 100, 300],
+                        help="number of classes of generated instances, 0 stands for GaSchedule.json")
+    parser.add_argument("--min-fitness", type=float, default=0.999)
+    parser.add_argument("--time-limit", type=float, default=60, help="seconds of each run")
+    parser.add_argument("--seed", type=int, default=1, help="seed of generated instances")
+    parser.add_argument("--output", help="JSON file which results are written to")
+    parser.add_argument("--compare", help="JSON file with baseline results")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="allowed decrease of evaluations per second compared to baseline")
+    parser.add_argument("--sorting", action="store_true",
+                        help="measure non-dominated sorting of populations of 100 to 2000 chromosomes instead")
+    args = parser.parse_args()
+
+    if args.sorting:
+        Benchmark.sorting()
+        return
+
+    benchmark = Benchmark(args.algorithms, args.sizes, args.min_fitness, args.time_limit, args.seed)
+    results = benchmark.run()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent="\t")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = Benchmark.compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Slower than baseline:", ", ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
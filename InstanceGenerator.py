@@ -0,0 +1,137 @@
+import argparse
+import json
+import random
+
+from model.Constant import Constant
+
+
+# Makes random configurations which can be read by Configuration.parseFile
+# Same seed and parameters always make the same configuration
+class InstanceGenerator:
+    # Longest class, in hours
+    MAX_DURATION = 4
+
+    def __init__(self, numberOfProfessors=10, numberOfGroups=10, numberOfRooms=10, numberOfLabs=3,
+                 numberOfClasses=100, numberOfCourses=None, roomUtilization=0.5, labRatio=0.5, groupOverlap=0.3,
+                 seed=None):
+        if numberOfLabs > numberOfRooms:
+            raise ValueError("Number of labs cannot be greater than number of rooms")
+        if min(numberOfProfessors, numberOfGroups, numberOfRooms, numberOfClasses) < 1:
+            raise ValueError("At least one professor, group, room and class is needed")
+
+        self._numberOfProfessors, self._numberOfGroups = numberOfProfessors, numberOfGroups
+        self._numberOfRooms, self._numberOfLabs = numberOfRooms, numberOfLabs
+        self._numberOfClasses = numberOfClasses
+        self._numberOfCourses = numberOfCourses or max(1, numberOfClasses // 2)
+        # Part of all time-space slots which are used by classes
+        self._roomUtilization = roomUtilization
+        # Hours of classes which require computers divided by hours available in labs
+        self._labRatio = labRatio
+        # Probability that class is attended by one more students group
+        self._groupOverlap = groupOverlap
+        self._random = random.Random(seed)
+
+    # Returns durations of classes, their sum is close to number of hours which should be used
+    def makeDurations(self):
+        rnd = self._random
+        hours = self._roomUtilization * self._numberOfRooms * Constant.DAYS_NUM * Constant.DAY_HOURS
+        mean = min(max(hours / self._numberOfClasses, 1), self.MAX_DURATION)
+        # round mean randomly, so average duration is equal to mean
+        low = int(mean)
+        return [min(low + (rnd.random() < mean - low), self.MAX_DURATION) for _ in range(self._numberOfClasses)]
+
+    # Returns flags of classes which require computers
+    def makeLabFlags(self, durations):
+        supply = self._numberOfLabs * Constant.DAYS_NUM * Constant.DAY_HOURS
+        demand = self._labRatio * supply
+        flags = len(durations) * [False]
+        indices = list(range(len(durations)))
+        self._random.shuffle(indices)
+        for i in indices:
+            # shorter class may still fit into remaining demand
+            if demand < durations[i]:
+                continue
+            flags[i] = True
+            demand -= durations[i]
+        return flags
+
+    # Returns list of objects in format of configuration file
+    def generate(self):
+        rnd = self._random
+        data = []
+
+        for i in range(1, self._numberOfProfessors + 1):
+            data.append({"prof": {"id": i, "name": "Professor " + str(i)}})
+
+        for i in range(1, self._numberOfCourses + 1):
+            data.append({"course": {"id": i, "name": "Course " + str(i)}})
+
+        groupSizes = {}
+        for i in range(1, self._numberOfGroups + 1):
+            groupSizes[i] = rnd.randrange(10, 31)
+
+        # each room has seats for the smallest group at least, so each class has some suitable room
+        smallestGroup = min(groupSizes.values())
+        rooms = []
+        for i in range(self._numberOfRooms):
+            lab = i < self._numberOfLabs
+            size = max(rnd.randrange(20, 65, 4), smallestGroup)
+            rooms.append((lab, size))
+            data.append({"room": {"name": ("L" if lab else "R") + str(i + 1), "lab": lab, "size": size}})
+
+        for i in range(1, self._numberOfGroups + 1):
+            data.append({"group": {"id": i, "name": "Group " + str(i), "size": groupSizes[i]}})
+
+        durations = self.makeDurations()
+        labFlags = self.makeLabFlags(durations)
+        largestRoom = max(size for lab, size in rooms)
+        largestLab = max((size for lab, size in rooms if lab), default=largestRoom)
+        for duration, lab in zip(durations, labFlags):
+            seats = largestLab if lab else largestRoom
+            # first group fits in the largest room which is suitable for class
+            groups = [rnd.choice([g for g in groupSizes if groupSizes[g] <= seats])]
+            # add more groups while they fit in some room
+            while len(groups) < self._numberOfGroups and rnd.random() < self._groupOverlap:
+                group = rnd.randrange(1, self._numberOfGroups + 1)
+                if group in groups:
+                    continue
+                if sum(groupSizes[g] for g in groups) + groupSizes[group] > seats:
+                    break
+                groups.append(group)
+
+            data.append({"class": {"professor": rnd.randrange(1, self._numberOfProfessors + 1),
+                                   "course": rnd.randrange(1, self._numberOfCourses + 1),
+                                   "duration": duration, "lab": lab, "groups": groups}})
+        return data
+
+    # Writes configuration to file
+    def write(self, fileName):
+        with open(fileName, "w", encoding="utf-8") as f:
+            json.dump(self.generate(), f, indent="\t")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Makes random configuration of class schedule.")
+    parser.add_argument("output", help="path of JSON file which is written")
+    parser.add_argument("--professors", type=int, default=10, help="number of professors")
+    parser.add_argument("--groups", type=int, default=10, help="number of students groups")
+    parser.add_argument("--rooms", type=int, default=10, help="number of rooms, including labs")
+    parser.add_argument("--labs", type=int, default=3, help="number of rooms with computers")
+    parser.add_argument("--classes", type=int, default=100, help="number of classes")
+    parser.add_argument("--courses", type=int, default=None, help="number of courses, half of classes by default")
+    parser.add_argument("--utilization", type=float, default=0.5,
+                        help="part of time-space slots used by classes")
+    parser.add_argument("--lab-ratio", type=float, default=0.5,
+                        help="hours of classes which require computers divided by hours available in labs")
+    parser.add_argument("--group-overlap", type=float, default=0.3,
+                        help="probability that class is attended by one more students group")
+    parser.add_argument("--seed", type=int, default=None, help="seed of random numbers")
+    args = parser.parse_args()
+
+    generator = InstanceGenerator(args.professors, args.groups, args.rooms, args.labs, args.classes, args.courses,
+                                  args.utilization, args.lab_ratio, args.group_overlap, args.seed)
+    generator.write(args.output)
+
+
+if __name__ == "__main__":
+    main()
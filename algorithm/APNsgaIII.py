@@ -79,66 +79,78 @@ class APNsgaIII(NsgaIII):
         result.sort(key = lambda chromosome: chromosome.fitness, reverse=True)
         return result
 
-    # initialize new population with chromosomes randomly built using prototype
-    def initialize(self):
-        result = [i for i in map(self.makeNew, range(self._populationSize))]
-        return result
-
     # Starts and executes algorithm
     def run(self, maxRepeat=9999, minFitness=0.999):
-        mutationSize, mutationProbability = self._mutationSize, self._mutationProbability
-        populationSize = self._populationSize
-        nMax = int(1.5 * populationSize)
-
-        population = self.initialize()
-
-        np.random.seed(int(time()))
-        pop = [population, None]
-
-        # Current generation
-        currentGeneration = 0
-
-        bestNotEnhance, lastBestFit = 0, 0.0
-
-        cur, next = 0, 1
-        while currentGeneration < self._max_iterations:
-            if currentGeneration > 0:
-                best = self.result
-                if bestNotEnhance < 15:
-                    print("Fitness:", "{:f}\t".format(best.fitness), "Generation:", currentGeneration, end="    \r")
-                else:
-                    print("Fitness:", "{:f}\t".format(best.fitness), "Generation:", currentGeneration, end=" ...\r")
+        self._profiler.attach(self._prototype)
+        try:
+            self._observer.start()
+            mutationSize, mutationProbability = self._mutationSize, self._mutationProbability
+            populationSize = self._populationSize
+            nMax = int(1.5 * populationSize)
+
+            with self._profiler.phase("initialize"):
+                population = self.initialize()
+            # Number of chromosomes whose fitness has been calculated
+            evaluations = len(population)
+
+            np.random.seed(int(time()))
+            pop = [population, None]
+
+            # Current generation
+            currentGeneration = 0
+
+            bestNotEnhance, lastBestFit = 0, 0.0
+
+            cur, next = 0, 1
+            while currentGeneration < self._max_iterations:
+                self._profiler.nextGeneration()
+                if currentGeneration > 0:
+                    best = self.result
+                    self._observer.notify(currentGeneration, best, evaluations)
+
+                    # algorithm or another island has reached criteria?
+                    if best.fitness > minFitness or (self._migration is not None and self._migration.stopped):
+                        break
+
+                    difference = abs(best.fitness - lastBestFit)
+                    if difference <= 0.0000001:
+                        bestNotEnhance += 1
+                    else:
+                        lastBestFit = best.fitness
+                        bestNotEnhance = 0
 
-                # algorithm has reached criteria?
-                if best.fitness > minFitness:
-                    break
+                    if bestNotEnhance > (maxRepeat / 50):
+                        self.reform()
 
-                difference = abs(best.fitness - lastBestFit)
-                if difference <= 0.0000001:
-                    bestNotEnhance += 1
-                else:
-                    lastBestFit = best.fitness
-                    bestNotEnhance = 0
+                # crossover
+                with self._profiler.phase("crossing"):
+                    offspring = self.crossing(pop[cur])
 
-                if bestNotEnhance > (maxRepeat / 50):
-                    self.reform()
+                # mutation
+                with self._profiler.phase("mutation"):
+                    self.mutation(offspring)
+                evaluations += len(offspring)
 
-            # crossover
-            offspring = self.crossing(pop[cur])
+                if self._migration is not None:
+                    offspring.extend(self._migration.exchange(currentGeneration, pop[cur]))
 
-            # mutation
-            self.mutation(offspring)
+                pop[cur].extend(offspring)
 
-            pop[cur].extend(offspring)
+                # replacement
+                with self._profiler.phase("replacement"):
+                    pop[next] = self.replacement(pop[cur])
+                self._best = pop[next][0] if pop[next][0].dominates(pop[cur][0]) else pop[cur][0]
 
-            # replacement
-            pop[next] = self.replacement(pop[cur])
-            self._best = pop[next][0] if pop[next][0].dominates(pop[cur][0]) else pop[cur][0]
+                with self._profiler.phase("dualCtrlStrategy"):
+                    self.dualCtrlStrategy(pop[next], bestNotEnhance, nMax)
 
-            self.dualCtrlStrategy(pop[next], bestNotEnhance, nMax)
+                cur, next = next, cur
+                currentGeneration += 1
 
-            cur, next = next, cur
-            currentGeneration += 1
+            self._observer.finish(currentGeneration, self.result, evaluations)
+        finally:
+            self._backend.shutdown()
+            self._profiler.detach(self._prototype)
 
     def __str__(self):
         return "Adaptive Population NSGA-III with Dual Control Strategy (APNsgaIII)"
@@ -1,11 +1,25 @@
+from model.PopulationEvaluator import PopulationEvaluator
 from model.Schedule import Schedule
+from .Profiler import NullProfiler
+from .Progress import ConsoleProgress
 import functools
+import heapq
+import numpy as np
 import random
 from collections import deque
 from random import randrange
 from time import time
 
 
+# Number of set bits of each byte value, used when numpy has no bitwise_count
+_BIT_COUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+# Returns number of set bits of each byte
+def _bitCount(a):
+    return np.bitwise_count(a) if hasattr(np, "bitwise_count") else _BIT_COUNT[a]
+
+
 # S. Tiwari, G. Fadel, and K. Deb, 
 # “AMGA2: Improving the performance of the archive-based micro-genetic algorithm for multi-objective optimization,” 
 # Eng. Optim., vol. 43, no. 4, pp. 371–401, 2011.
@@ -28,6 +42,14 @@ class Amga2:
         self._offspringPopulation = []
         self._combinedPopulation = []
         self._populationSize = self._archiveSize = numberOfChromosomes
+        # Evaluates whole population at once, used when batch evaluation is chosen
+        self._evaluator = None
+        # Exchanges chromosomes with other islands, used by island model
+        self._migration = None
+        # Measures time of phases of algorithm, does nothing unless profiling is enabled
+        self._profiler = NullProfiler()
+        # Notified about progress in each generation, shows it in console by default
+        self._observer = ConsoleProgress()
 
         # Initializes genetic algorithm
 
@@ -37,42 +59,40 @@ class Amga2:
         self._mutationSize, self._etaCross = mutationSize, etaCross
         self._crossoverProbability, self._mutationProbability = crossoverProbability, mutationProbability
 
-    @functools.total_ordering
-    class DistanceMatrix:
-        def __init__(self):
-            self.index1 = -1
-            self.index2 = -1
-            self.distance = 0.0
-
-        def __lt__(self, other):
-            if self is None:
-                return 0
-
-            if self.distance < other.distance:
-                return -1
-            if self.distance > other.distance:
-                return 1
-            if self.index1 < other.index1:
-                return -1
-            if self.index1 > other.index1:
-                return 1
-            if self.index2 < other.index2:
-                return -1
-            if self.index2 > other.index2:
-                return 1
-            return 0
-
-        def __eq__(self, other):
-            return self.index1 == other.index1 and self.index2 == other.index2 and self.distance == other.distance
-
-        def __ne__(self, other):
-            return not self.__eq__(other)
-
     @property
     # Returns pointer to best chromosomes in population
     def result(self):
         return self._combinedPopulation[0]
 
+    @property
+    # Returns object which exchanges chromosomes with other populations of island model
+    def migration(self):
+        return self._migration
+
+    @migration.setter
+    def migration(self, migration):
+        self._migration = migration
+
+    @property
+    # Returns profiler which measures time of phases of algorithm
+    def profiler(self):
+        return self._profiler
+
+    @profiler.setter
+    # Sets Profiler to measure phases of algorithm, or NullProfiler to disable measuring
+    def profiler(self, profiler):
+        self._profiler = profiler
+
+    @property
+    # Returns observer which is notified about progress of algorithm
+    def observer(self):
+        return self._observer
+
+    @observer.setter
+    # Sets observer of progress, e.g. ConsoleProgress or silent ProgressObserver
+    def observer(self, observer):
+        self._observer = observer
+
     # initialize new population with chromosomes randomly built using prototype
     def initialize(self):
         prototype = self._prototype
@@ -81,20 +101,41 @@ class Amga2:
         parentPopulation = self._parentPopulation = []
         offspringPopulation = self._offspringPopulation = []
         combinedPopulation = self._combinedPopulation = []
+        evaluator = self._evaluator
+        evaluate = evaluator is None
 
         for i in range(archiveSize):
-            archivePopulation.append(prototype.makeNewFromPrototype())
-            combinedPopulation.append(prototype.makeNewFromPrototype())
+            archivePopulation.append(prototype.makeNewFromPrototype(evaluate=evaluate))
+            combinedPopulation.append(prototype.makeNewFromPrototype(evaluate=evaluate))
 
         for i in range(populationSize):
-            parentPopulation.append(prototype.makeNewFromPrototype())
-            offspringPopulation.append(prototype.makeNewFromPrototype())
-            combinedPopulation.append(prototype.makeNewFromPrototype())
+            parentPopulation.append(prototype.makeNewFromPrototype(evaluate=evaluate))
+            offspringPopulation.append(prototype.makeNewFromPrototype(evaluate=evaluate))
+            combinedPopulation.append(prototype.makeNewFromPrototype(evaluate=evaluate))
+
+        if evaluator is not None:
+            evaluator.evaluatePopulation(archivePopulation + parentPopulation + offspringPopulation + combinedPopulation)
 
     def assignInfiniteDiversity(self, population, elite):
         for index in elite:
             population[index].diversity = float("inf")
 
+    # Returns flags of class requirements of chromosomes packed into bits, one row per chromosome
+    def packCriteria(self, population, indices):
+        return np.packbits(np.array([population[index].criteria for index in indices], dtype=bool), axis=1)
+
+    # Returns matrix of Hamming distances between flags of class requirements of chromosomes,
+    # which are equal to their differences, rows are compared in blocks to limit memory of temporary array
+    def distanceMatrix(self, population, indices):
+        packed = self.packCriteria(population, indices)
+        size = len(packed)
+        distance = np.empty((size, size), dtype=float)
+        blockSize = max(1, (1 << 24) // max(1, size * packed.shape[1]))
+        for start in range(0, size, blockSize):
+            block = packed[start: start + blockSize, None, :] ^ packed
+            distance[start: start + len(block)] = _bitCount(block).sum(axis=2)
+        return distance
+
     def assignDiversityMetric(self, population, elite):
         if len(elite) <= 2:
             self.assignInfiniteDiversity(population, elite)
@@ -105,35 +146,27 @@ class Amga2:
             self.assignInfiniteDiversity(population, elite)
             return
 
-        size = len(distinct)
         for e in distinct:
             population[e].diversity = 0.0
 
-        val = population[distinct[size - 1]].getDifference(population[distinct[0]])
+        packed = self.packCriteria(population, distinct)
+        val = _bitCount(packed[-1] ^ packed[0]).sum()
         if val == 0:
             return
 
-        for j in range(size):
-            if j == 0:
-                diff = population[distinct[j + 1]].getDifference(population[distinct[j]])
-                hashArray = (0.0, population[distinct[j]].fitness, population[distinct[j + 1]].fitness)
-                r = diff / val
-                population[distinct[j]].diversity += (r * r)
-            elif j == size - 1:
-                diff = population[distinct[j]].getDifference(population[distinct[j - 1]])
-                l = diff / val
-                population[distinct[j]].diversity += (l * l)
-            else:
-                diff = population[distinct[j]].getDifference(population[distinct[j - 1]])
-                l = diff / val
-                diff = population[distinct[j + 1]].getDifference(population[distinct[j]])
-                r = diff / val
-                population[distinct[j]].diversity += (l * r)
+        # differences of neighbours in order of fitness
+        diff = _bitCount(packed[1:] ^ packed[: -1]).sum(axis=1) / val
+        diversity = np.empty(len(distinct))
+        diversity[0], diversity[-1] = diff[0] * diff[0], diff[-1] * diff[-1]
+        diversity[1: -1] = diff[: -1] * diff[1:]
+        for e, d in zip(distinct, diversity.tolist()):
+            population[e].diversity = d
 
     def createOffspringPopulation(self):
         currentArchiveSize, populationSize = self._currentArchiveSize, self._populationSize
         archivePopulation, parentPopulation, offspringPopulation = self._archivePopulation, self._parentPopulation,self._offspringPopulation
         etaCross, crossoverProbability = self._etaCross, self._crossoverProbability
+        evaluate = self._evaluator is None
 
         for i in range(populationSize):
             r1 = -1
@@ -147,7 +180,7 @@ class Amga2:
                 r3 = randrange(currentArchiveSize)
             offspringPopulation[i] = offspringPopulation[i].crossovers(parentPopulation[i], archivePopulation[r1],
                                                                        archivePopulation[r2], archivePopulation[r3],
-                                                                       etaCross, crossoverProbability)
+                                                                       etaCross, crossoverProbability, evaluate)
             offspringPopulation[i].rank = parentPopulation[i].rank  # for rank based mutation
 
     @functools.total_ordering
@@ -162,84 +195,63 @@ class Amga2:
         return sorted(set(elite), key=lambda e: population[e].fitness)
 
     def extractENNSPopulation(self, mixedPopulation, pool, desiredEliteSize):
-        poolSize, mixedSize = len(pool), len(mixedPopulation)
         filtered = [index for index in pool if mixedPopulation[index].diversity == float("inf")]
         numInf = len(filtered)
         if desiredEliteSize <= numInf:
             return filtered[:desiredEliteSize]
 
-        elite = deque(dict.fromkeys(pool))
+        elite = list(dict.fromkeys(pool))
         pool.clear()
-        if desiredEliteSize <= numInf:
-            return elite
-
-        distance = [[0 for x in range(poolSize)] for y in range(poolSize)]
-        indexArray = poolSize * [0]
-        originalArray = mixedSize * [-1]
-
-        for counter, index in enumerate(elite):
-            indexArray[counter] = index
-            originalArray[index] = counter
-
-        distArray = []
-        for i in range(poolSize):
-            for j in range(i + 1, poolSize):
-                distMatrix = Amga2.DistanceMatrix()
-                distMatrix.index1 = indexArray[i]
-                distMatrix.index2 = indexArray[j]
-                distMatrix.distance = mixedPopulation[distMatrix.index1].getDifference(mixedPopulation[distMatrix.index2])
-                distance[j][i] = distance[i][j] = distMatrix.distance
-                distArray.append(distMatrix)
-
-        distArray.sort()
-        distArray_len = len(distArray)
-        idx = 0
-        while len(elite) > desiredEliteSize and idx < distArray_len:
-            temp = distArray[idx]
-            idx += 1
-            index1, index2 = temp.index1, temp.index2
-
-            while (originalArray[index1] == -1 or originalArray[index2] == -1) and idx < distArray_len:
-                temp = distArray[idx]
-                idx += 1
-                index1, index2 = temp.index1, temp.index2
-
-            if idx >= distArray_len:
-                break
 
-            if mixedPopulation[index1].diversity == float("inf") and mixedPopulation[index2].diversity == float("inf"):
+        size = len(elite)
+        distance = self.distanceMatrix(mixedPopulation, elite)
+        infinite = np.array([mixedPopulation[index].diversity == float("inf") for index in elite], dtype=bool)
+        # pair of individuals with infinite diversity is never eliminated, nor individual paired with itself
+        distance[np.ix_(infinite, infinite)] = float("inf")
+        np.fill_diagonal(distance, float("inf"))
+        remaining = np.ones(size, dtype=bool)
+
+        # heap holds nearest neighbour of each individual, ties are broken by positions of pair in elite
+        # entry is updated when it is popped after its neighbour has been eliminated
+        def nearestPair(i):
+            j = int(np.argmin(distance[i]))
+            return distance[i, j], min(i, j), max(i, j), i
+
+        nearest = np.argmin(distance, axis=1).tolist()
+        heap = [(distance[i, j], min(i, j), max(i, j), i) for i, j in enumerate(nearest)]
+        heapq.heapify(heap)
+
+        eliteSize = size
+        while eliteSize > desiredEliteSize and heap:
+            dist, index1, index2, i = heapq.heappop(heap)
+            if not remaining[i]:
+                continue
+            if dist == float("inf"):
+                break
+            if not remaining[index1] or not remaining[index2]:
+                heapq.heappush(heap, nearestPair(i))
                 continue
 
-            if mixedPopulation[index1].diversity == float("inf"):
-                elite.remove(index2)
-                pool.append(index2)
-                originalArray[index2] = -1
-            elif mixedPopulation[index2].diversity == float("inf"):
-                elite.remove(index1)
-                pool.append(index1)
-                originalArray[index1] = -1
+            if infinite[index1]:
+                eliminated = index2
+            elif infinite[index2]:
+                eliminated = index1
             else:
-                dist1 = float("inf")
-                for index in elite:
-                    if index != index1 and index != index2:
-                        if dist1 > distance[originalArray[index1]][originalArray[index]]:
-                            dist1 = distance[originalArray[index1]][originalArray[index]]
-
-                dist2 = float("inf")
-                for index in elite:
-                    if index != index1 and index != index2:
-                        if dist2 > distance[originalArray[index2]][originalArray[index]]:
-                            dist2 = distance[originalArray[index2]][originalArray[index]]
-
-                if dist1 < dist2:
-                    elite.remove(index1)
-                    pool.append(index1)
-                    originalArray[index1] = -1
-                else:
-                    elite.remove(index2)
-                    pool.append(index2)
-                    originalArray[index2] = -1
-
+                # distance of each individual of pair to nearest other individual
+                others = remaining.copy()
+                others[[index1, index2]] = False
+                dist1 = np.min(distance[index1, others], initial=float("inf"))
+                dist2 = np.min(distance[index2, others], initial=float("inf"))
+                eliminated = index1 if dist1 < dist2 else index2
+
+            remaining[eliminated] = False
+            distance[eliminated, :] = distance[:, eliminated] = float("inf")
+            pool.append(elite[eliminated])
+            eliteSize -= 1
+            if i != eliminated:
+                heapq.heappush(heap, nearestPair(i))
+
+        elite = deque(index for index, flag in zip(elite, remaining) if flag)
         while len(elite) > desiredEliteSize:
             pool.append(elite.popleft())
 
@@ -339,10 +351,14 @@ class Amga2:
         currentArchiveSize, populationSize = self._currentArchiveSize, self._populationSize
         mutationProbability, mutationSize = self._mutationProbability, self._mutationSize
         offspringPopulation = self._offspringPopulation
+        evaluator = self._evaluator
         for i in range(populationSize):
             pMut = mutationProbability + (1.0 - mutationProbability) * (
                         float(offspringPopulation[i].rank - 1) / (currentArchiveSize - 1))  # rank-based variation
-            offspringPopulation[i].mutation(mutationSize, pMut)
+            offspringPopulation[i].mutation(mutationSize, pMut, evaluator is None)
+
+        if evaluator is not None:
+            evaluator.evaluatePopulation(offspringPopulation)
 
     def updateArchivePopulation(self):
         currentArchiveSize, populationSize = self._currentArchiveSize, self._populationSize
@@ -397,43 +413,69 @@ class Amga2:
             self._mutationProbability += 1.0;
 
     # Starts and executes algorithm
-    def run(self, maxRepeat=9999, minFitness=0.999):
-        self.initialize()
-        self._currentArchiveSize = self._populationSize
-        createParentPopulation, createOffspringPopulation = self.createParentPopulation, self.createOffspringPopulation
-        mutateOffspringPopulation, updateArchivePopulation = self.mutateOffspringPopulation, self.updateArchivePopulation
-        random.seed(round(time() * 1000))
-
-        # Current generation
-        currentGeneration = 0
-
-        repeat, lastBestFit = 0, 0.0
-
-        while 1:
-            if currentGeneration > 0:
-                bestFitness = self.result.fitness
-                print("Fitness:", "{:f}\t".format(bestFitness), "Generation:", currentGeneration, end="\r")
-
-                # algorithm has reached criteria?
-                if bestFitness > minFitness:
-                    self.finalizePopulation()
-                    break
-
-                difference = abs(bestFitness - lastBestFit)
-                if difference <= 0.0000001:
-                    repeat += 1
-                else:
-                    repeat = 0
-
-                if repeat > (maxRepeat / 100):
-                    self.reform()
-                lastBestFit = bestFitness
-
-            createParentPopulation()
-            createOffspringPopulation()
-            mutateOffspringPopulation()
-            updateArchivePopulation()
-            currentGeneration += 1
+    # When batchEvaluation is set, fitness of offspring is calculated for whole generation at once
+    def run(self, maxRepeat=9999, minFitness=0.999, batchEvaluation=False):
+        self._profiler.attach(self._prototype)
+        try:
+            self._observer.start()
+            self._evaluator = PopulationEvaluator(self._prototype.configuration) if batchEvaluation else None
+            with self._profiler.phase("initialize"):
+                self.initialize()
+            # Number of chromosomes whose fitness has been calculated
+            evaluations = self._populationSize
+            self._currentArchiveSize = self._populationSize
+            createParentPopulation, createOffspringPopulation = self.createParentPopulation, self.createOffspringPopulation
+            mutateOffspringPopulation, updateArchivePopulation = self.mutateOffspringPopulation, self.updateArchivePopulation
+            random.seed(round(time() * 1000))
+
+            # Current generation
+            currentGeneration = 0
+
+            repeat, lastBestFit = 0, 0.0
+
+            while 1:
+                self._profiler.nextGeneration()
+                if currentGeneration > 0:
+                    best = self.result
+                    bestFitness = best.fitness
+                    self._observer.notify(currentGeneration, best, evaluations)
+
+                    # algorithm or another island has reached criteria?
+                    if bestFitness > minFitness or (self._migration is not None and self._migration.stopped):
+                        self.finalizePopulation()
+                        break
+
+                    difference = abs(bestFitness - lastBestFit)
+                    if difference <= 0.0000001:
+                        repeat += 1
+                    else:
+                        repeat = 0
+
+                    if repeat > (maxRepeat / 100):
+                        self.reform()
+                    lastBestFit = bestFitness
+
+                with self._profiler.phase("createParentPopulation"):
+                    createParentPopulation()
+                with self._profiler.phase("createOffspringPopulation"):
+                    createOffspringPopulation()
+                with self._profiler.phase("mutateOffspringPopulation"):
+                    mutateOffspringPopulation()
+                evaluations += self._populationSize
+
+                if self._migration is not None:
+                    # chromosomes from other islands take place of last offspring
+                    immigrants = self._migration.exchange(currentGeneration, self._archivePopulation[: self._currentArchiveSize])
+                    immigrants = immigrants[: self._populationSize]
+                    self._offspringPopulation[self._populationSize - len(immigrants):] = immigrants
+
+                with self._profiler.phase("updateArchivePopulation"):
+                    updateArchivePopulation()
+                currentGeneration += 1
+
+            self._observer.finish(currentGeneration, self.result, evaluations)
+        finally:
+            self._profiler.detach(self._prototype)
 
     def __str__(self):
         return "Archive-based Micro Genetic Algorithm (AMGA2)"
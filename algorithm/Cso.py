@@ -31,36 +31,29 @@ class Cso(NsgaIII):
         self._current_position = [[]]
 
 
+    # Population is made by backend of algorithm, positions of swarm start at zero
     def initialize(self, population):
-        prototype = self._prototype
-
-        populationSize = self._populationSize
-        for i in range(populationSize):
-            positions = []
-            # add new chromosome to population
-            population[i] = prototype.makeNewFromPrototype(positions)
-            if i < 1:
-                self._chromlen = len(positions)
-                self._current_position = np.zeros((populationSize, self._chromlen), dtype=float)
-                self._lf = LévyFlights(self._chromlen)
+        population[:] = super().initialize()
+        # day, room and time of each class
+        self._chromlen = 3 * len(population[0].classes)
+        self._current_position = np.zeros((self._populationSize, self._chromlen), dtype=float)
+        self._lf = LévyFlights(self._chromlen)
 
 
+    # Moves each nest by differences of two other nests in randomly chosen genes, for whole population at once
     def updateVelocities(self, population):
-        current_position = np.copy(self._current_position)
-        populationSize = self._populationSize
-        for i in range(populationSize):
-            d1, d2 = np.random.randint(0, 5, 2)
-            while d1 == d2:
-                d2 = np.random.randint(0, 5)
-            changed = False
-            for j in range(self._chromlen):
-                r = np.random.rand()
-                if r < self._pa:
-                    changed = True
-                    self._current_position[i, j] += random.random() * (current_position[d1, j] - current_position[d2, j])
-
-            if changed:
-                self._current_position[i] = self._lf.optimum(self._current_position[i], population[i])
+        current_position = self._current_position
+        populationSize, chromlen = self._populationSize, self._chromlen
+        # two different nests among the first five for each nest
+        d1 = np.random.randint(0, 5, populationSize)
+        d2 = (d1 + np.random.randint(1, 5, populationSize)) % 5
+        mask = np.random.rand(populationSize, chromlen) < self._pa
+        step = np.random.rand(populationSize, chromlen) * (current_position[d1] - current_position[d2])
+        current_position += np.where(mask, step, 0.0)
+
+        # only nests which have moved are checked whether they are better
+        moved = np.flatnonzero(mask.any(axis=1))
+        current_position[moved] = self._lf.optimums(current_position[moved], population, moved)
 
 
     def reform(self):
@@ -73,67 +66,84 @@ class Cso(NsgaIII):
 
 
     def replacement(self, population):
-        populationSize = self._populationSize
-        self._gBest = self._lf.updatePositions(population, populationSize, self._current_position, self._gBest)
-        self.updateVelocities(population)
-
-        for i in range(populationSize):
-            chromosome = self._prototype.makeEmptyFromPrototype()
-            chromosome.updatePositions(self._current_position[i])
-            population[i] = chromosome
+        with self._profiler.phase("updatePositions"):
+            # chromosomes are made again only for nests whose accepted positions have changed
+            self._gBest = self._lf.updatePositions(population, self._populationSize, self._current_position,
+                                                   self._gBest)
+            self.updateVelocities(population)
 
         return super().replacement(population)
 
 
     # Starts and executes algorithm
     def run(self, maxRepeat=9999, minFitness=0.999):
-        mutationSize, mutationProbability = self._mutationSize, self._mutationProbability
-        populationSize = self._populationSize
-        population = populationSize * [None]
-
-        self.initialize(population)
-        random.seed(round(time() * 1000))
-        np.random.seed(int(time()))
-        pop = [population, None]
-
-        # Current generation
-        currentGeneration = 0
-        bestNotEnhance, lastBestFit = 0, 0.0
-
-        cur, next = 0, 1
-        while currentGeneration < self._max_iterations:
-            if currentGeneration > 0:
-                best = self.result
-                print("Fitness:", "{:f}\t".format(best.fitness), "Generation:", currentGeneration, end="\r")
-
-                # algorithm has reached criteria?
-                if best.fitness > minFitness:
-                    break
-
-                difference = abs(best.fitness - lastBestFit)
-                if difference <= 0.0000001:
-                    bestNotEnhance += 1
-                else:
-                    lastBestFit = best.fitness
-                    bestNotEnhance = 0
-
-                if bestNotEnhance > (maxRepeat / 50):
-                    self.reform()
-
-            # crossover
-            offspring = self.crossing(pop[cur])
-
-            # mutation
-            self.mutation(offspring)
-
-            pop[cur].extend(offspring)
-
-            # replacement
-            pop[next] = self.replacement(pop[cur])
-            self._best = pop[next][0] if pop[next][0].dominates(pop[cur][0]) else pop[cur][0]
-
-            cur, next = next, cur
-            currentGeneration += 1
+        self._profiler.attach(self._prototype)
+        try:
+            self._observer.start()
+            mutationSize, mutationProbability = self._mutationSize, self._mutationProbability
+            populationSize = self._populationSize
+            population = populationSize * [None]
+
+            with self._profiler.phase("initialize"):
+                self.initialize(population)
+            # Number of chromosomes whose fitness has been calculated
+            evaluations = populationSize
+            random.seed(round(time() * 1000))
+            np.random.seed(int(time()))
+            pop = [population, None]
+
+            # Current generation
+            currentGeneration = 0
+            bestNotEnhance, lastBestFit = 0, 0.0
+
+            cur, next = 0, 1
+            while currentGeneration < self._max_iterations:
+                self._profiler.nextGeneration()
+                if currentGeneration > 0:
+                    best = self.result
+                    self._observer.notify(currentGeneration, best, evaluations)
+
+                    # algorithm or another island has reached criteria?
+                    if best.fitness > minFitness or (self._migration is not None and self._migration.stopped):
+                        break
+
+                    difference = abs(best.fitness - lastBestFit)
+                    if difference <= 0.0000001:
+                        bestNotEnhance += 1
+                    else:
+                        lastBestFit = best.fitness
+                        bestNotEnhance = 0
+
+                    if bestNotEnhance > (maxRepeat / 50):
+                        self.reform()
+
+                # crossover
+                with self._profiler.phase("crossing"):
+                    offspring = self.crossing(pop[cur])
+
+                # mutation
+                with self._profiler.phase("mutation"):
+                    self.mutation(offspring)
+                # offspring and new positions of swarm
+                evaluations += len(offspring) + populationSize
+
+                if self._migration is not None:
+                    offspring.extend(self._migration.exchange(currentGeneration, pop[cur]))
+
+                pop[cur].extend(offspring)
+
+                # replacement
+                with self._profiler.phase("replacement"):
+                    pop[next] = self.replacement(pop[cur])
+                self._best = pop[next][0] if pop[next][0].dominates(pop[cur][0]) else pop[cur][0]
+
+                cur, next = next, cur
+                currentGeneration += 1
+
+            self._observer.finish(currentGeneration, self.result, evaluations)
+        finally:
+            self._backend.shutdown()
+            self._profiler.detach(self._prototype)
 
     def __str__(self):
         return "Cuckoo Search Optimization (CSO)"
@@ -0,0 +1,69 @@
+# Finds offspring which are identical to chromosomes of population or to other offspring
+# In drop mode clones are removed, in mutate mode copy of clone is mutated until it differs from all others,
+# and it is removed when number of attempts is exhausted
+class Deduplication:
+    DROP, MUTATE = "drop", "mutate"
+
+    def __init__(self, mode=MUTATE, mutationSize=2, attempts=3):
+        if mode not in (self.DROP, self.MUTATE):
+            raise ValueError("Unknown mode of deduplication: " + str(mode))
+
+        self._mode = mode
+        self._mutationSize = mutationSize
+        self._attempts = attempts
+        # hashes of genotypes and identities of chromosomes already in population
+        self._seen, self._members = set(), set()
+        # Number of clones found and number of them which have been removed
+        self.clones = self.dropped = 0
+
+    @property
+    def mode(self):
+        return self._mode
+
+    # Returns hash of reservation indices of chromosome
+    @staticmethod
+    def key(chromosome):
+        return hash(chromosome.genotype().tobytes())
+
+    # Remembers chromosomes of population, offspring are compared with them
+    def start(self, population):
+        self._seen = {self.key(chromosome) for chromosome in population}
+        self._members = {id(chromosome) for chromosome in population}
+
+    # Returns chromosome when it is not clone, otherwise its mutated copy or None when clone is removed
+    # Chromosome which is returned is remembered, so the next clones of it are found too
+    # When evaluate is not set, fitness of mutated copy is not calculated, e.g. because clone has not been evaluated yet
+    def unique(self, chromosome, evaluate=True):
+        key = self.key(chromosome)
+        if key in self._seen or id(chromosome) in self._members:
+            self.clones += 1
+            chromosome = self.__mutate(chromosome, evaluate)
+            if chromosome is None:
+                self.dropped += 1
+                return None
+            key = self.key(chromosome)
+
+        self._seen.add(key)
+        self._members.add(id(chromosome))
+        return chromosome
+
+    # Returns offspring without clones
+    def apply(self, offspring, population, evaluate=True):
+        self.start(population)
+        return [child for child in (self.unique(child, evaluate) for child in offspring) if child is not None]
+
+    # Returns mutated copy of chromosome which differs from all chromosomes seen, or None
+    def __mutate(self, chromosome, evaluate):
+        if self._mode == self.DROP:
+            return None
+
+        # chromosome may be shared with population, e.g. when crossover has not happened
+        mutant = chromosome.copy(chromosome, True).copy(chromosome, False)
+        for _ in range(self._attempts):
+            mutant.mutation(self._mutationSize, 100, evaluate)
+            if self.key(mutant) not in self._seen:
+                return mutant
+        return None
+
+    def __str__(self):
+        return "{} clones found, {} dropped".format(self.clones, self.dropped)
@@ -1,6 +1,5 @@
 from .LévyFlights import LévyFlights
 from .NsgaIII import NsgaIII
-import math
 import numpy as np
 import random
 from time import time
@@ -32,76 +31,70 @@ class Dlba(NsgaIII):
         self._maxValues, self._lf = None, None
 
 
+    # Population is made by backend of algorithm, positions of bats start at zero
     def initialize(self, population):
-        prototype = self._prototype
-
-        self._maxValues = []
-        prototype.makeEmptyFromPrototype(self._maxValues)
+        maxValues = []
+        self._prototype.makeEmptyFromPrototype(maxValues)
+        self._maxValues = np.array(maxValues, dtype=float)
 
+        population[:] = super().initialize()
         populationSize = self._populationSize
-        for i in range(populationSize):
-            positions = []
-            # add new chromosome to population
-            population[i] = prototype.makeNewFromPrototype(positions)
-            if i < 1:
-                self._chromlen = len(positions)
-                self._rate = np.zeros(populationSize, dtype=float)
-                self._loudness = np.zeros(populationSize, dtype=float)
-                self._position = np.zeros((populationSize, self._chromlen), dtype=float)
-                self._lf = LévyFlights(self._chromlen)
-
-            self._rate[i] = random.random()
-            self._loudness[i] = random.random() + 1
+        self._chromlen = len(maxValues)
+        self._rate = np.array([random.random() for _ in range(populationSize)], dtype=float)
+        self._loudness = np.array([random.random() + 1 for _ in range(populationSize)], dtype=float)
+        self._position = np.zeros((populationSize, self._chromlen), dtype=float)
+        self._lf = LévyFlights(self._chromlen)
 
 
+    # Moves whole swarm at once, random numbers of all bats are drawn together
     def updatePositions(self, population):
         mean = np.mean(self._loudness)
-        currentGeneration, prototype = self._currentGeneration, self._prototype
+        currentGeneration = self._currentGeneration
         gBest, maxValues, minValue = self._gBest, self._maxValues, self._minValue
         position, rate, loudness = self._position, self._rate, self._loudness
 
         if gBest is None:
-            gBest = position[0]
-        prevBest = prototype.makeEmptyFromPrototype()
-        prevBest.updatePositions(gBest)
-
-        populationSize = self._populationSize
-        for i in range(populationSize):
-            beta, rand = np.random.uniform(size=2)
-            𝛽1, 𝛽2 = np.random.uniform(low=-1, high=1, size=2)
-            r1, r2, r3, r4 = np.random.randint(0, populationSize, 4)
-            while r1 == r2:
-                r2 = np.random.randint(0, populationSize)
-            while r3 == r4:
-                r4 = np.random.randint(0, populationSize)
-
-            for j in range(self._chromlen):
-                f1 = ((minValue - maxValues[j]) * currentGeneration / 𝛽1 + maxValues[j]) * beta
-                f2 = ((maxValues[j] - minValue) * currentGeneration / 𝛽2 + minValue) * beta
-                position[i, j] = gBest[j] + f1 * (position[r1][j] - position[r2][j]) + f2 * (position[r3][j] - position[r3][j])
-
-                if rand > rate[i]:
-                    𝜀 = np.random.uniform(low=-1, high=1)
-                    position[i, j] += gBest[j] + 𝜀 * mean
-
-            gBest = self._lf.updatePosition(population[i], position, i, gBest)
+            gBest = np.copy(position[0])
+        prevBest = np.copy(gBest)
+
+        populationSize, chromlen = self._populationSize, self._chromlen
+        beta, rand = np.random.uniform(size=(2, populationSize, 1))
+        𝛽1, 𝛽2 = np.random.uniform(low=-1, high=1, size=(2, populationSize, 1))
+        # two pairs of different bats for each bat
+        r1, r3 = np.random.randint(0, populationSize, (2, populationSize))
+        r2 = (r1 + np.random.randint(1, populationSize, populationSize)) % populationSize
+        r4 = (r3 + np.random.randint(1, populationSize, populationSize)) % populationSize
+
+        # differential operator with two leaders
+        f1 = ((minValue - maxValues) * currentGeneration / 𝛽1 + maxValues) * beta
+        f2 = ((maxValues - minValue) * currentGeneration / 𝛽2 + minValue) * beta
+        position[:] = gBest + f1 * (position[r1] - position[r2]) + f2 * (position[r3] - position[r4])
+
+        # local random walk of bats whose pulse rate is exceeded
+        walk = np.flatnonzero(rand[:, 0] > rate)
+        𝜀 = np.random.uniform(low=-1, high=1, size=(len(walk), chromlen))
+        position[walk] += gBest + 𝜀 * mean
+
+        gBest = self._lf.updatePositions(population, populationSize, position, gBest)
+
+        # global best of previous and current positions are compared at once
+        evaluator = self._lf.getEvaluator(population[0])
+        genotypes = evaluator.decodePositions(np.vstack((prevBest, gBest)))[0]
+        objectives = evaluator.evaluateGenotypes(genotypes)[1]
+        # loudness and pulse rate are changed when global best has become worse than previous one
+        previousDominates = LévyFlights.dominates(objectives[:1], objectives[1:])[0]
 
-
-        globalBest = prototype.makeEmptyFromPrototype()
-        globalBest.updatePositions(gBest)
         mean = np.mean(rate)
-        for i in range(populationSize):
-            positionTemp = np.copy(position)
-            if random.random() < loudness[i]:
-                𝜂 = np.random.uniform(low=-1, high=1)
-                for j in range(self._chromlen):
-                    position[i, j] = gBest[j] + 𝜂 * mean
-
-                if prevBest.dominates(globalBest):
-                    rate[i] *= (currentGeneration / 𝜂) ** 3
-                    loudness[i] *= self._alpha
+        loud = np.flatnonzero(np.random.random(populationSize) < loudness)
+        𝜂 = np.random.uniform(low=-1, high=1, size=(len(loud), 1))
+        position[loud] = gBest + 𝜂 * mean
+        if previousDominates:
+            rate[loud] *= (currentGeneration / 𝜂[:, 0]) ** 3
+            loudness[loud] *= self._alpha
 
-            position[i] = self._lf.optimum(position[i], population[i])
+        # only bats which have been moved are checked whether they are better, chromosomes of the others
+        # already match their positions
+        position[loud] = self._lf.optimums(position[loud], population, loud)
 
 
     def reform(self):
@@ -114,67 +107,83 @@ class Dlba(NsgaIII):
 
 
     def replacement(self, population):
-        populationSize = self._populationSize
-        self.updatePositions(population)
-
-        for i in range(populationSize):
-            chromosome = self._prototype.makeEmptyFromPrototype()
-            chromosome.updatePositions(self._position[i])
-            population[i] = chromosome
+        with self._profiler.phase("updatePositions"):
+            # chromosomes are made again only for bats whose accepted positions have changed
+            self.updatePositions(population)
 
         return super().replacement(population)
 
 
     # Starts and executes algorithm
     def run(self, maxRepeat=9999, minFitness=0.999):
-        mutationSize, mutationProbability = self._mutationSize, self._mutationProbability
-        populationSize = self._populationSize
-        population = populationSize * [None]
-
-        self.initialize(population)
-        random.seed(round(time() * 1000))
-        np.random.seed(int(time()))
-        pop = [population, None]
-
-        # Current generation
-        currentGeneration = 0
-        bestNotEnhance, lastBestFit = 0, 0.0
-
-        cur, next = 0, 1
-        while currentGeneration < self._max_iterations:
-            if currentGeneration > 0:
-                best = self.result
-                print("Fitness:", "{:f}\t".format(best.fitness), "Generation:", currentGeneration, end="\r")
-
-                # algorithm has reached criteria?
-                if best.fitness > minFitness:
-                    break
-
-                difference = abs(best.fitness - lastBestFit)
-                if difference <= 0.0000001:
-                    bestNotEnhance += 1
-                else:
-                    lastBestFit = best.fitness
-                    bestNotEnhance = 0
-
-                if bestNotEnhance > (maxRepeat / 50):
-                    self.reform()
-
-            # crossover
-            offspring = self.crossing(pop[cur])
-
-            # mutation
-            self.mutation(offspring)
-
-            pop[cur].extend(offspring)
-
-            # replacement
-            pop[next] = self.replacement(pop[cur])
-            self._best = pop[next][0] if pop[next][0].dominates(pop[cur][0]) else pop[cur][0]
-
-            cur, next = next, cur
-            currentGeneration += 1
-            self._currentGeneration = currentGeneration
+        self._profiler.attach(self._prototype)
+        try:
+            self._observer.start()
+            mutationSize, mutationProbability = self._mutationSize, self._mutationProbability
+            populationSize = self._populationSize
+            population = populationSize * [None]
+
+            with self._profiler.phase("initialize"):
+                self.initialize(population)
+            # Number of chromosomes whose fitness has been calculated
+            evaluations = populationSize
+            random.seed(round(time() * 1000))
+            np.random.seed(int(time()))
+            pop = [population, None]
+
+            # Current generation
+            currentGeneration = 0
+            bestNotEnhance, lastBestFit = 0, 0.0
+
+            cur, next = 0, 1
+            while currentGeneration < self._max_iterations:
+                self._profiler.nextGeneration()
+                if currentGeneration > 0:
+                    best = self.result
+                    self._observer.notify(currentGeneration, best, evaluations)
+
+                    # algorithm or another island has reached criteria?
+                    if best.fitness > minFitness or (self._migration is not None and self._migration.stopped):
+                        break
+
+                    difference = abs(best.fitness - lastBestFit)
+                    if difference <= 0.0000001:
+                        bestNotEnhance += 1
+                    else:
+                        lastBestFit = best.fitness
+                        bestNotEnhance = 0
+
+                    if bestNotEnhance > (maxRepeat / 50):
+                        self.reform()
+
+                # crossover
+                with self._profiler.phase("crossing"):
+                    offspring = self.crossing(pop[cur])
+
+                # mutation
+                with self._profiler.phase("mutation"):
+                    self.mutation(offspring)
+                # offspring and new positions of swarm
+                evaluations += len(offspring) + populationSize
+
+                if self._migration is not None:
+                    offspring.extend(self._migration.exchange(currentGeneration, pop[cur]))
+
+                pop[cur].extend(offspring)
+
+                # replacement
+                with self._profiler.phase("replacement"):
+                    pop[next] = self.replacement(pop[cur])
+                self._best = pop[next][0] if pop[next][0].dominates(pop[cur][0]) else pop[cur][0]
+
+                cur, next = next, cur
+                currentGeneration += 1
+                self._currentGeneration = currentGeneration
+
+            self._observer.finish(currentGeneration, self.result, evaluations)
+        finally:
+            self._backend.shutdown()
+            self._profiler.detach(self._prototype)
 
     def __str__(self):
         return "Bat algorithm with differential operator and Levy flights trajectory (DLBA)"
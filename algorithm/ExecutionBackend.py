@@ -0,0 +1,351 @@
+from model.Schedule import Schedule
+from model.SharedPopulation import SharedPopulation
+from .Profiler import NullProfiler
+import concurrent.futures
+import numpy as np
+import os
+from numpy.random import randint as randrange
+from time import perf_counter, time
+
+
+# Executes genetic operations of population serially in calling thread
+class SerialBackend:
+    # Records tasks executed by workers, does nothing unless profiling is enabled
+    _profiler = NullProfiler()
+
+    @property
+    def profiler(self):
+        return self._profiler
+
+    @profiler.setter
+    def profiler(self, profiler):
+        self._profiler = profiler
+
+    # initialize new population with chromosomes randomly built using prototype
+    def initialize(self, prototype, size, evaluate=True):
+        return [prototype.makeNewFromPrototype(evaluate=evaluate) for _ in range(size)]
+
+    # Makes two children of each pair of parents
+    def crossover(self, pairs, numberOfCrossoverPoints, crossoverProbability, evaluate=True):
+        offspring = []
+        for father, mother in pairs:
+            offspring.append(father.crossover(mother, numberOfCrossoverPoints, crossoverProbability, evaluate))
+            offspring.append(mother.crossover(father, numberOfCrossoverPoints, crossoverProbability, evaluate))
+        return offspring
+
+    # Performs mutation on each chromosome of population
+    def mutation(self, population, mutationSize, mutationProbability, evaluate=True):
+        for chromosome in population:
+            chromosome.mutation(mutationSize, mutationProbability, evaluate)
+
+    # Releases workers, backend can be used again later
+    def shutdown(self):
+        pass
+
+    def __str__(self):
+        return "serial"
+
+
+# Executes genetic operations of population by pool of threads which is kept between generations
+class ThreadBackend(SerialBackend):
+    def __init__(self, maxWorkers=4):
+        self._maxWorkers = maxWorkers
+        self._executor = None
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self._maxWorkers)
+        return self._executor
+
+    def initialize(self, prototype, size, evaluate=True):
+        def makeNew(x):
+            with self._profiler.phase("initialize task"):
+                return prototype.makeNewFromPrototype(evaluate=evaluate)
+
+        return list(self.executor.map(makeNew, range(size)))
+
+    def crossover(self, pairs, numberOfCrossoverPoints, crossoverProbability, evaluate=True):
+        def crossover(pair):
+            with self._profiler.phase("crossover task"):
+                father, mother = pair
+                child0 = father.crossover(mother, numberOfCrossoverPoints, crossoverProbability, evaluate)
+                child1 = mother.crossover(father, numberOfCrossoverPoints, crossoverProbability, evaluate)
+                return (child0, child1)
+
+        offspring = []
+        futures = [self.executor.submit(crossover, pair) for pair in pairs]
+        for future in concurrent.futures.as_completed(futures):
+            # append child chromosome to offspring list
+            offspring.extend(future.result())
+        return offspring
+
+    def mutation(self, population, mutationSize, mutationProbability, evaluate=True):
+        def mutate(chromosome):
+            with self._profiler.phase("mutation task"):
+                return chromosome.mutation(mutationSize, mutationProbability, evaluate)
+
+        futures = [self.executor.submit(mutate, chromosome) for chromosome in population]
+        concurrent.futures.wait(futures)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __str__(self):
+        return "threads"
+
+
+# Prototype of chromosomes in worker process, made from configuration when worker starts
+_prototype = None
+
+
+def _initWorker(configuration):
+    global _prototype
+    _prototype = Schedule(configuration)
+    # workers must not repeat random numbers of each other, unless tasks are seeded by main process
+    np.random.seed((os.getpid() * 7919 + int(time() * 1000)) % (2 ** 32))
+
+
+# Executes task in worker and returns its result with time when it has been executed and ID of worker
+# When seed is given, random numbers of task do not depend on worker which executes it
+def _timed(name, seed, function, *args):
+    if seed is not None:
+        np.random.seed(seed)
+    start = perf_counter()
+    result = function(*args)
+    return result, name, start, perf_counter() - start, os.getpid()
+
+
+# Converts chromosome to tuple which is cheap to send between processes
+def _pack(chromosome):
+    return chromosome.genotype(), np.packbits(chromosome.criteria), chromosome.objectives, chromosome.fitness
+
+
+# Makes chromosome from tuple returned by _pack
+def _unpack(prototype, packed):
+    genotype, criteria, objectives, fitness = packed
+    chromosome = prototype.makeFromGenotype(genotype)
+    chromosome.setEvaluation(np.unpackbits(criteria, count=len(chromosome.criteria)), objectives, fitness)
+    return chromosome
+
+
+def _makeNew(size, evaluate):
+    return [_pack(_prototype.makeNewFromPrototype(evaluate=evaluate)) for _ in range(size)]
+
+
+def _crossover(pairs, numberOfCrossoverPoints, crossoverProbability, evaluate):
+    offspring = []
+    for packed0, packed1 in pairs:
+        father, mother = _unpack(_prototype, packed0), _unpack(_prototype, packed1)
+        offspring.append(_pack(father.crossover(mother, numberOfCrossoverPoints, crossoverProbability, evaluate)))
+        offspring.append(_pack(mother.crossover(father, numberOfCrossoverPoints, crossoverProbability, evaluate)))
+    return offspring
+
+
+def _mutate(population, mutationSize, evaluate):
+    result = []
+    for packed in population:
+        chromosome = _unpack(_prototype, packed)
+        # probability of mutation is already checked by caller
+        chromosome.mutation(mutationSize, 100, evaluate)
+        result.append(_pack(chromosome))
+    return result
+
+
+# Shared populations which worker process is attached to, by name of shared memory block
+_shared = {}
+
+
+# Returns shared population made by main process, worker stays attached to few most recent ones
+def _attach(name, capacity):
+    population = _shared.get(name)
+    if population is None:
+        while len(_shared) > 3:
+            _shared.pop(next(iter(_shared))).close()
+        population = _shared[name] = SharedPopulation(_prototype.configuration, capacity, name)
+    return population
+
+
+def _makeNewShared(target, start, stop, evaluate):
+    population = _attach(*target)
+    for i in range(start, stop):
+        population.store(i, _prototype.makeNewFromPrototype(evaluate=evaluate))
+
+
+# Parents are read through views, so their classes are not placed
+# Returns rows of offspring which are copies of parents because crossover has not happened, with rows of those parents
+def _crossoverShared(source, target, pairs, start, numberOfCrossoverPoints, crossoverProbability, evaluate):
+    parents, offspring = _attach(*source), _attach(*target)
+    copied = []
+    for i, j in pairs:
+        for father, mother in ((i, j), (j, i)):
+            # probability of crossover is checked here, so parent which is not crossed is copied in shared memory
+            if randrange(100) > crossoverProbability:
+                offspring.copy(start, parents, father)
+                copied.append((start, father))
+            else:
+                offspring.store(start, _prototype.makeFromParents(parents.view(father), parents.view(mother),
+                                                                  numberOfCrossoverPoints, evaluate))
+            start += 1
+    return copied
+
+
+def _mutateShared(target, rows, mutationSize, evaluate):
+    population = _attach(*target)
+    for i in rows:
+        chromosome = population.load(_prototype, i)
+        # probability of mutation is already checked by caller
+        chromosome.mutation(mutationSize, 100, evaluate)
+        population.store(i, chromosome)
+
+
+# Executes genetic operations of population by pool of processes which is kept between generations
+# Configuration is sent to each worker once, chromosomes are sent as genotypes with their fitness
+# When sharedMemory is set, chromosomes are exchanged through SharedPopulation instead and only row numbers are sent
+# Then workers read parents of crossover through views, and parents which are not crossed are copied between rows,
+# so their classes are not placed again, but new offspring and mutated chromosomes are still made by main process
+# When seed is given, each task gets its own seed spawned from it, so run of workers can be repeated
+class ProcessBackend(SerialBackend):
+    def __init__(self, configuration, maxWorkers=None, sharedMemory=False, seed=None):
+        self._configuration = configuration
+        self._maxWorkers = maxWorkers or os.cpu_count()
+        self._executor = None
+        self._sharedMemory = sharedMemory
+        # Shared populations of parents and offspring, made when they are needed first time
+        self._shared = {}
+        # Source of seeds of tasks, None when workers are seeded by clock
+        self._seedSequence = None if seed is None else np.random.SeedSequence(seed)
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=self._maxWorkers,
+                                                                    initializer=_initWorker,
+                                                                    initargs=(self._configuration,))
+        return self._executor
+
+    # Submits task to workers, its result is obtained by collect
+    def submit(self, name, function, *args):
+        seed = None if self._seedSequence is None else self._seedSequence.spawn(1)[0].generate_state(4)
+        return self.executor.submit(_timed, name, seed, function, *args)
+
+    # Returns result of task and records time of task executed by worker
+    def collect(self, future):
+        result, name, start, seconds, pid = future.result()
+        self._profiler.add(name, seconds, start, pid, pid)
+        return result
+
+    # Splits items into chunks, a few for each worker
+    def chunks(self, items):
+        size = max(1, -(-len(items) // (self._maxWorkers * 4)))
+        return [items[i: i + size] for i in range(0, len(items), size)]
+
+    # Returns shared population for given purpose which has room for given number of chromosomes
+    def shared(self, key, capacity):
+        population = self._shared.get(key)
+        if population is None or population.capacity < capacity:
+            if population is not None:
+                population.close()
+                population.unlink()
+            # leave room for population which grows
+            population = self._shared[key] = SharedPopulation(self._configuration, capacity * 3 // 2)
+        return population
+
+    def initialize(self, prototype, size, evaluate=True):
+        if self._sharedMemory:
+            offspring = self.shared("offspring", size)
+            target = (offspring.name, offspring.capacity)
+            futures = [self.submit("initialize task", _makeNewShared, target, chunk.start, chunk.stop, evaluate)
+                       for chunk in self.chunks(range(size))]
+            for future in futures:
+                self.collect(future)
+            return [offspring.load(prototype, i) for i in range(size)]
+
+        futures = [self.submit("initialize task", _makeNew, len(chunk), evaluate) for chunk in self.chunks(range(size))]
+        population = []
+        for future in futures:
+            population.extend(_unpack(prototype, packed) for packed in self.collect(future))
+        return population
+
+    def crossover(self, pairs, numberOfCrossoverPoints, crossoverProbability, evaluate=True):
+        if not pairs:
+            return []
+
+        prototype = pairs[0][0]
+        if self._sharedMemory:
+            # each parent is stored once, even if it is selected several times
+            rows = {}
+            for father, mother in pairs:
+                rows.setdefault(id(father), (len(rows), father))
+                rows.setdefault(id(mother), (len(rows), mother))
+            parents, offspring = self.shared("parents", len(rows)), self.shared("offspring", 2 * len(pairs))
+            for i, chromosome in rows.values():
+                parents.store(i, chromosome)
+
+            source, target = (parents.name, parents.capacity), (offspring.name, offspring.capacity)
+            rowPairs = [(rows[id(father)][0], rows[id(mother)][0]) for father, mother in pairs]
+            futures, start = [], 0
+            for chunk in self.chunks(rowPairs):
+                futures.append(self.submit("crossover task", _crossoverShared, source, target, chunk, start,
+                                           numberOfCrossoverPoints, crossoverProbability, evaluate))
+                start += 2 * len(chunk)
+            children = 2 * len(pairs) * [None]
+            chromosomes = {i: chromosome for i, chromosome in rows.values()}
+            for future in futures:
+                # parent which has not been crossed is copied, so its classes are not placed again
+                for i, parent in self.collect(future):
+                    chromosome = chromosomes[parent]
+                    children[i] = chromosome.copy(chromosome, True).copy(chromosome, False)
+            return [offspring.load(prototype, i) if child is None else child for i, child in enumerate(children)]
+
+        packedPairs = [(_pack(father), _pack(mother)) for father, mother in pairs]
+        futures = [self.submit("crossover task", _crossover, chunk, numberOfCrossoverPoints, crossoverProbability,
+                               evaluate) for chunk in self.chunks(packedPairs)]
+
+        # offspring are kept in order of pairs, so they do not depend on which task has finished first
+        offspring = []
+        for future in futures:
+            offspring.extend(_unpack(prototype, packed) for packed in self.collect(future))
+        return offspring
+
+    def mutation(self, population, mutationSize, mutationProbability, evaluate=True):
+        # check probability of mutation operation here, so only chromosomes which are mutated are sent
+        selected = [i for i in range(len(population)) if randrange(100) <= mutationProbability]
+        if not selected:
+            return
+
+        prototype = population[selected[0]]
+        if self._sharedMemory:
+            parents = self.shared("parents", len(selected))
+            for row, i in enumerate(selected):
+                parents.store(row, population[i])
+
+            target = (parents.name, parents.capacity)
+            futures = [self.submit("mutation task", _mutateShared, target, chunk, mutationSize, evaluate)
+                       for chunk in self.chunks(range(len(selected)))]
+            for future in futures:
+                self.collect(future)
+            for row, i in enumerate(selected):
+                population[i] = parents.load(prototype, row)
+            return
+
+        chunks = self.chunks(selected)
+        futures = [self.submit("mutation task", _mutate, [_pack(population[i]) for i in chunk], mutationSize, evaluate)
+                   for chunk in chunks]
+        for chunk, future in zip(chunks, futures):
+            for i, packed in zip(chunk, self.collect(future)):
+                population[i] = _unpack(prototype, packed)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        for population in self._shared.values():
+            population.close()
+            population.unlink()
+        self._shared.clear()
+
+    def __str__(self):
+        return "processes (shared memory)" if self._sharedMemory else "processes"
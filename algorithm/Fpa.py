@@ -1,6 +1,5 @@
 from .LévyFlights import LévyFlights
 from .NsgaIII import NsgaIII
-import math
 import numpy as np
 import random
 from time import time
@@ -29,36 +28,38 @@ class Fpa(NsgaIII):
         self._current_position = [[]]
 
 
+    # Population is made by backend of algorithm, positions of swarm start at zero
     def initialize(self, population):
-        prototype = self._prototype
-
-        populationSize = self._populationSize
-        for i in range(populationSize):
-            positions = []
-            # add new chromosome to population
-            population[i] = prototype.makeNewFromPrototype(positions)
-            if i < 1:
-                self._chromlen = len(positions)
-                self._current_position = np.zeros((populationSize, self._chromlen), dtype=float)
-                self._lf = LévyFlights(self._chromlen)
+        population[:] = super().initialize()
+        # day, room and time of each class
+        self._chromlen = 3 * len(population[0].classes)
+        self._current_position = np.zeros((self._populationSize, self._chromlen), dtype=float)
+        self._lf = LévyFlights(self._chromlen)
 
 
+    # Pollinates whole population at once, flowers chosen by switch probability are moved by Lévy flights
+    # and the others by difference of two other flowers
     def updatePositions(self, population):
         current_position = np.copy(self._current_position)
         populationSize = self._populationSize
-        for i in range(populationSize):
-            r = np.random.rand()
-            if r < self._pa:
-                self._gBest = self._lf.updatePosition(population[i], self._current_position, i, self._gBest)
-            else:
-                d1, d2 = np.random.randint(0, populationSize, 2)
-                while d1 == d2:
-                    d2 = np.random.randint(0, populationSize)
-
-                for j in range(self._chromlen):
-                    self._current_position[i, j] += random.random() * (current_position[d1, j] - current_position[d2, j])
-
-                self._current_position[i] = self._lf.optimum(self._current_position[i], population[i])
+        switch = np.random.rand(populationSize) < self._pa
+
+        # global pollination
+        pollinators = np.flatnonzero(switch)
+        if len(pollinators) > 0:
+            chromosomes = [population[i] for i in pollinators]
+            positions = self._current_position[pollinators]
+            self._gBest = self._lf.updatePositions(chromosomes, len(pollinators), positions, self._gBest)
+            self._current_position[pollinators] = positions
+            for i, chromosome in zip(pollinators, chromosomes):
+                population[i] = chromosome
+
+        # local pollination by two different flowers
+        local = np.flatnonzero(~switch)
+        d1 = np.random.randint(0, populationSize, len(local))
+        d2 = (d1 + np.random.randint(1, populationSize, len(local))) % populationSize
+        step = np.random.rand(len(local), self._chromlen) * (current_position[d1] - current_position[d2])
+        self._current_position[local] = self._lf.optimums(self._current_position[local] + step, population, local)
 
 
     def reform(self):
@@ -71,66 +72,82 @@ class Fpa(NsgaIII):
 
 
     def replacement(self, population):
-        populationSize = self._populationSize
-        self.updatePositions(population)
-
-        for i in range(populationSize):
-            chromosome = self._prototype.makeEmptyFromPrototype()
-            chromosome.updatePositions(self._current_position[i])
-            population[i] = chromosome
+        with self._profiler.phase("updatePositions"):
+            # chromosomes are made again only for flowers whose accepted positions have changed
+            self.updatePositions(population)
 
         return super().replacement(population)
 
 
     # Starts and executes algorithm
     def run(self, maxRepeat=9999, minFitness=0.999):
-        mutationSize, mutationProbability = self._mutationSize, self._mutationProbability
-        populationSize = self._populationSize
-        population = populationSize * [None]
-
-        self.initialize(population)
-        random.seed(round(time() * 1000))
-        np.random.seed(int(time()))
-        pop = [population, None]
-
-        # Current generation
-        currentGeneration = 0
-        bestNotEnhance, lastBestFit = 0, 0.0
-
-        cur, next = 0, 1
-        while currentGeneration < self._max_iterations:
-            if currentGeneration > 0:
-                best = self.result
-                print("Fitness:", "{:f}\t".format(best.fitness), "Generation:", currentGeneration, end="\r")
-
-                # algorithm has reached criteria?
-                if best.fitness > minFitness:
-                    break
-
-                difference = abs(best.fitness - lastBestFit)
-                if difference <= 0.0000001:
-                    bestNotEnhance += 1
-                else:
-                    lastBestFit = best.fitness
-                    bestNotEnhance = 0
-
-                if bestNotEnhance > (maxRepeat / 50):
-                    self.reform()
-
-            # crossover
-            offspring = self.crossing(pop[cur])
-
-            # mutation
-            self.mutation(offspring)
-
-            pop[cur].extend(offspring)
-
-            # replacement
-            pop[next] = self.replacement(pop[cur])
-            self._best = pop[next][0] if pop[next][0].dominates(pop[cur][0]) else pop[cur][0]
-
-            cur, next = next, cur
-            currentGeneration += 1
+        self._profiler.attach(self._prototype)
+        try:
+            self._observer.start()
+            mutationSize, mutationProbability = self._mutationSize, self._mutationProbability
+            populationSize = self._populationSize
+            population = populationSize * [None]
+
+            with self._profiler.phase("initialize"):
+                self.initialize(population)
+            # Number of chromosomes whose fitness has been calculated
+            evaluations = populationSize
+            random.seed(round(time() * 1000))
+            np.random.seed(int(time()))
+            pop = [population, None]
+
+            # Current generation
+            currentGeneration = 0
+            bestNotEnhance, lastBestFit = 0, 0.0
+
+            cur, next = 0, 1
+            while currentGeneration < self._max_iterations:
+                self._profiler.nextGeneration()
+                if currentGeneration > 0:
+                    best = self.result
+                    self._observer.notify(currentGeneration, best, evaluations)
+
+                    # algorithm or another island has reached criteria?
+                    if best.fitness > minFitness or (self._migration is not None and self._migration.stopped):
+                        break
+
+                    difference = abs(best.fitness - lastBestFit)
+                    if difference <= 0.0000001:
+                        bestNotEnhance += 1
+                    else:
+                        lastBestFit = best.fitness
+                        bestNotEnhance = 0
+
+                    if bestNotEnhance > (maxRepeat / 50):
+                        self.reform()
+
+                # crossover
+                with self._profiler.phase("crossing"):
+                    offspring = self.crossing(pop[cur])
+
+                # mutation
+                with self._profiler.phase("mutation"):
+                    self.mutation(offspring)
+                # offspring and new positions of swarm
+                evaluations += len(offspring) + populationSize
+
+                if self._migration is not None:
+                    offspring.extend(self._migration.exchange(currentGeneration, pop[cur]))
+
+                pop[cur].extend(offspring)
+
+                # replacement
+                with self._profiler.phase("replacement"):
+                    pop[next] = self.replacement(pop[cur])
+                self._best = pop[next][0] if pop[next][0].dominates(pop[cur][0]) else pop[cur][0]
+
+                cur, next = next, cur
+                currentGeneration += 1
+
+            self._observer.finish(currentGeneration, self.result, evaluations)
+        finally:
+            self._backend.shutdown()
+            self._profiler.detach(self._prototype)
 
     def __str__(self):
         return "Flower Pollination Algorithm (FPA)";
@@ -1,8 +1,7 @@
 from .NsgaIII import NsgaIII
-import math
+from .Swarm import Swarm
 import numpy as np
 import random
-from random import randrange
 from time import time
 
 
@@ -26,135 +25,137 @@ class GaQpso(NsgaIII):
         self._gBest, self._pBestScore = [], []
 
         self._current_position, self.__pBestPosition = [[]], [[]]
+        # decodes and evaluates positions of whole swarm at once
+        self._swarm = Swarm()
 
 
+    # Population is made by backend of algorithm, positions of particles start at zero
     def initialize(self, population):
-        prototype = self._prototype
-
+        population[:] = super().initialize()
         populationSize = len(population)
-        for i in range(populationSize):
-            positions = []
-            # add new chromosome to population
-            population[i] = prototype.makeNewFromPrototype(positions)
-            if i < 1:
-                self._chromlen = len(positions)
-                self._gBest = np.zeros(self._chromlen, dtype=float)
-                self._pBestScore = np.zeros(populationSize, dtype=float)
-                self._pBestPosition = np.zeros((populationSize, self._chromlen), dtype=float)
-                self._current_position = np.zeros((populationSize, self._chromlen), dtype=float)
-
-
-    def optimum(self, localVal, chromosome):
-        localBest = self._prototype.makeEmptyFromPrototype()
-        localBest.updatePositions(localVal)
-
-        if localBest.dominates(chromosome):
-            chromosome.updatePositions(localVal)
-            return localVal
-
-        positions = np.zeros(self._chromlen, dtype=float)
-        chromosome.extractPositions(positions)
-        return positions
+        # day, room and time of each class
+        self._chromlen = 3 * len(population[0].classes)
+        self._gBest = np.zeros(self._chromlen, dtype=float)
+        self._pBestScore = np.zeros(populationSize, dtype=float)
+        self._pBestPosition = np.zeros((populationSize, self._chromlen), dtype=float)
+        self._current_position = np.zeros((populationSize, self._chromlen), dtype=float)
 
 
     @staticmethod
     def gaussian(x, sigma):
-        return np.random.randn() * sigma + x
+        return np.random.randn(*np.shape(x)) * sigma + x
 
 
+    # Updates positions of whole swarm at once, gene values of all particles are drawn together
+    # and new positions are decoded and evaluated as a batch
     def updatePosition(self, population):
-        mBest = np.zeros(self._chromlen, dtype=float)
+        swarm, populationSize = self._swarm, self._populationSize
         current_position = np.copy(self._current_position)
-        populationSize = self._populationSize
 
-        for i in range(populationSize):
-            fitness = population[i].fitness
-            if fitness > self._pBestScore[i]:
-                self._pBestScore[i] = fitness
-                population[i].extractPositions(self._current_position[i])
-                self._pBestPosition[i] = self._current_position[i][:]
-            self._gBest = self.optimum(self._gBest, population[i])
+        evaluation, positions = swarm.gather(population[: populationSize])
+        fitness = evaluation[3]
+        improved = fitness > self._pBestScore
+        self._pBestScore[improved] = fitness[improved]
+        self._current_position[improved] = positions[improved]
+        self._pBestPosition[improved] = positions[improved]
+        mBest = np.mean(self._pBestPosition, axis=0)
 
-            mBest += self._pBestPosition[i] / populationSize
+        _, self._gBest, changed = swarm.lead(evaluation, positions, self._gBest)
 
         alpha = self._alpha0 + (self._max_iterations - self._currentGeneration) * (self._alpha1 - self._alpha0) / self._max_iterations
-        for i in range(populationSize):
-            for j in range(self._chromlen):
-                phi, u = np.random.rand(2)
-                p = phi * self._pBestPosition[i, j] + (1 - phi) * self._gBest[j]
-                n_p = GaQpso.gaussian(p, mBest[j] - self._pBestPosition[i, j])
-                NP = p if randrange(100) < self._mutationProbability else n_p
-
-                if np.random.rand() > .5:
-                    self._current_position[i, j] += NP + alpha * abs(mBest[j] - current_position[i, j]) * math.log(1.0 / u)
-                else:
-                    self._current_position[i, j] += NP - alpha * abs(mBest[j] - current_position[i, j]) * math.log(1.0 / u)
+        shape = (populationSize, self._chromlen)
+        phi, u = np.random.rand(2, *shape)
+        # local attractor, it is Gaussian distributed except for genes chosen with probability of mutation
+        p = phi * self._pBestPosition + (1 - phi) * self._gBest
+        NP = np.where(np.random.randint(100, size=shape) < self._mutationProbability, p,
+                      GaQpso.gaussian(p, mBest - self._pBestPosition))
+        # contraction-expansion term is added or subtracted with the same probability
+        delta = alpha * np.abs(mBest - current_position) * np.log(1.0 / u)
+        self._current_position += NP + np.where(np.random.rand(*shape) > .5, delta, -delta)
 
-            self._current_position[i] = self.optimum(self._current_position[i], population[i])
+        # chromosome is replaced by its new position when that one dominates it
+        better, self._current_position = swarm.accept(self._current_position, evaluation, positions)
+        swarm.replace(population, range(populationSize), evaluation, changed | better)
 
 
     def replacement(self, population):
-        populationSize = self._populationSize
-        self.updatePosition(population)
-
-        for i in range(populationSize):
-            chromosome = self._prototype.makeEmptyFromPrototype()
-            chromosome.updatePositions(self._current_position[i])
-            population[i] = chromosome
+        with self._profiler.phase("updatePositions"):
+            # chromosomes are made again only for particles whose accepted positions have changed
+            self.updatePosition(population)
 
         return super().replacement(population)
 
 
     # Starts and executes algorithm
     def run(self, maxRepeat=9999, minFitness=0.999):
-        mutationSize, mutationProbability = self._mutationSize, self._mutationProbability
-        populationSize = self._populationSize
-        population = populationSize * [None]
-
-        self.initialize(population)
-        random.seed(round(time() * 1000))
-        np.random.seed(int(time()))
-        pop = [population, None]
-
-        # Current generation
-        currentGeneration = self._currentGeneration
-        bestNotEnhance, lastBestFit = 0, 0.0
-
-        cur, next = 0, 1
-        while currentGeneration < self._max_iterations:
-            if currentGeneration > 0:
-                best = self.result
-                print("Fitness:", "{:f}\t".format(best.fitness), "Generation:", currentGeneration, end="\r")
-
-                # algorithm has reached criteria?
-                if best.fitness > minFitness:
-                    break
-
-                difference = abs(best.fitness - lastBestFit)
-                if difference <= 0.0000001:
-                    bestNotEnhance += 1
-                else:
-                    lastBestFit = best.fitness
-                    bestNotEnhance = 0
-
-                if bestNotEnhance > (maxRepeat / 50):
-                    self.reform()
-
-            # crossover
-            offspring = self.crossing(pop[cur])
-
-            # mutation
-            self.mutation(offspring)
-
-            pop[cur].extend(offspring)
-
-            # replacement
-            pop[next] = self.replacement(pop[cur])
-            self._best = pop[next][0] if pop[next][0].dominates(pop[cur][0]) else pop[cur][0]
-
-            cur, next = next, cur
-            currentGeneration += 1
-            self._currentGeneration = currentGeneration
+        self._profiler.attach(self._prototype)
+        try:
+            self._observer.start()
+            mutationSize, mutationProbability = self._mutationSize, self._mutationProbability
+            populationSize = self._populationSize
+            population = populationSize * [None]
+
+            with self._profiler.phase("initialize"):
+                self.initialize(population)
+            # Number of chromosomes whose fitness has been calculated
+            evaluations = populationSize
+            random.seed(round(time() * 1000))
+            np.random.seed(int(time()))
+            pop = [population, None]
+
+            # Current generation
+            currentGeneration = self._currentGeneration
+            bestNotEnhance, lastBestFit = 0, 0.0
+
+            cur, next = 0, 1
+            while currentGeneration < self._max_iterations:
+                self._profiler.nextGeneration()
+                if currentGeneration > 0:
+                    best = self.result
+                    self._observer.notify(currentGeneration, best, evaluations)
+
+                    # algorithm or another island has reached criteria?
+                    if best.fitness > minFitness or (self._migration is not None and self._migration.stopped):
+                        break
+
+                    difference = abs(best.fitness - lastBestFit)
+                    if difference <= 0.0000001:
+                        bestNotEnhance += 1
+                    else:
+                        lastBestFit = best.fitness
+                        bestNotEnhance = 0
+
+                    if bestNotEnhance > (maxRepeat / 50):
+                        self.reform()
+
+                # crossover
+                with self._profiler.phase("crossing"):
+                    offspring = self.crossing(pop[cur])
+
+                # mutation
+                with self._profiler.phase("mutation"):
+                    self.mutation(offspring)
+                # offspring and new positions of swarm
+                evaluations += len(offspring) + populationSize
+
+                if self._migration is not None:
+                    offspring.extend(self._migration.exchange(currentGeneration, pop[cur]))
+
+                pop[cur].extend(offspring)
+
+                # replacement
+                with self._profiler.phase("replacement"):
+                    pop[next] = self.replacement(pop[cur])
+                self._best = pop[next][0] if pop[next][0].dominates(pop[cur][0]) else pop[cur][0]
+
+                cur, next = next, cur
+                currentGeneration += 1
+                self._currentGeneration = currentGeneration
+
+            self._observer.finish(currentGeneration, self.result, evaluations)
+        finally:
+            self._backend.shutdown()
+            self._profiler.detach(self._prototype)
 
     def __str__(self):
         return "Gaussian distributed local attractor QPSO (GAQPSO)"
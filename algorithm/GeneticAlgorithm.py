@@ -1,4 +1,7 @@
+from model.PopulationEvaluator import PopulationEvaluator
 from model.Schedule import Schedule
+from .Profiler import NullProfiler
+from .Progress import ConsoleProgress
 import random
 from random import randrange
 from time import time
@@ -34,6 +37,16 @@ class GeneticAlgorithm:
         self._bestChromosomes = trackBest * [0]
         # Number of chromosomes which are replaced in each generation by offspring
         self.set_replace_by_generation(replaceByGeneration)
+        # Evaluates whole population at once, used when batch evaluation is chosen
+        self._evaluator = None
+        # Exchanges chromosomes with other islands, used by island model
+        self._migration = None
+        # Measures time of phases of algorithm, does nothing unless profiling is enabled
+        self._profiler = NullProfiler()
+        # Notified about progress in each generation, shows it in console by default
+        self._observer = ConsoleProgress()
+        # Removes or mutates clones among offspring, disabled by default
+        self._deduplication = None
 
     # Initializes genetic algorithm
     def __init__(self, configuration, numberOfCrossoverPoints=2, mutationSize=2, crossoverProbability=80,
@@ -49,6 +62,45 @@ class GeneticAlgorithm:
     def result(self):
         return self._chromosomes[self._bestChromosomes[0]]
 
+    @property
+    # Returns object which exchanges chromosomes with other populations of island model
+    def migration(self):
+        return self._migration
+
+    @migration.setter
+    def migration(self, migration):
+        self._migration = migration
+
+    @property
+    # Returns profiler which measures time of phases of algorithm
+    def profiler(self):
+        return self._profiler
+
+    @profiler.setter
+    # Sets Profiler to measure phases of algorithm, or NullProfiler to disable measuring
+    def profiler(self, profiler):
+        self._profiler = profiler
+
+    @property
+    # Returns observer which is notified about progress of algorithm
+    def observer(self):
+        return self._observer
+
+    @observer.setter
+    # Sets observer of progress, e.g. ConsoleProgress or silent ProgressObserver
+    def observer(self, observer):
+        self._observer = observer
+
+    @property
+    # Returns stage which removes or mutates offspring identical to other chromosomes, None when it is disabled
+    def deduplication(self):
+        return self._deduplication
+
+    @deduplication.setter
+    # Sets Deduplication run on offspring before they enter population, or None to disable it
+    def deduplication(self, deduplication):
+        self._deduplication = deduplication
+
     def set_replace_by_generation(self, value):
         numberOfChromosomes = len(self._chromosomes)
         trackBest = len(self._bestChromosomes)
@@ -108,32 +160,67 @@ class GeneticAlgorithm:
         # addToBest = self.addToBest
         prototype = self._prototype
         length_chromosomes = len(population)
+        evaluator = self._evaluator
 
         for i in range(0, length_chromosomes):
             # add new chromosome to population
-            population[i] = prototype.makeNewFromPrototype()
+            population[i] = prototype.makeNewFromPrototype(evaluate=evaluator is None)
             # addToBest(i)
 
+        if evaluator is not None:
+            evaluator.evaluatePopulation(population)
+
     def selection(self, population):
         length_chromosomes = len(population)
         return (population[randrange(32768) % length_chromosomes],  population[randrange(32768) % length_chromosomes])
 
-    def replacement(self, population, replaceByGeneration) -> []:
-        mutationSize = self._mutationSize
-        numberOfCrossoverPoints = self._numberOfCrossoverPoints
-        crossoverProbability = self._crossoverProbability
-        mutationProbability = self._mutationProbability
+    # Makes offspring of pair of parents by crossover and mutation, returns it and whether its fitness is calculated
+    # With deduplication, clones are found before fitness of offspring is calculated, so clone which is dropped
+    # is not evaluated at all and None is returned for it
+    def __makeOffspring(self, parent, evaluate):
+        deduplication = self._deduplication
+        # with deduplication fitness is calculated when offspring is known not to be clone
+        early = evaluate and deduplication is None
+        child = parent[0].crossover(parent[1], self._numberOfCrossoverPoints, self._crossoverProbability, early)
+        # parent which has not been crossed has its fitness already, mutation updates it
+        evaluated = early or child is parent[0]
+        child.mutation(self._mutationSize, self._mutationProbability, evaluated)
+        if deduplication is not None:
+            child = deduplication.unique(child, evaluated)
+            if evaluate and child is not None and not evaluated:
+                child.calculateFitness()
+                evaluated = True
+        return child, evaluated
+
+    # Replaces chromosomes of population by offspring, returns number of offspring whose fitness has been calculated
+    # Clones dropped by deduplication are not evaluated, so they are not counted
+    def replacement(self, population, replaceByGeneration) -> int:
         selection = self.selection
         isInBest = self.isInBest
         length_chromosomes = len(population)
+        evaluator = self._evaluator
+        deduplication = self._deduplication
+        if deduplication is not None:
+            deduplication.start(population)
         # produce offspring
         offspring = replaceByGeneration * [None]
+        if evaluator is not None:
+            # all offspring are made before replacement and evaluated at once
+            pending = []
+            for j in range(replaceByGeneration):
+                offspring[j], evaluated = self.__makeOffspring(selection(population), False)
+                if offspring[j] is not None and not evaluated:
+                    pending.append(offspring[j])
+            evaluator.evaluatePopulation(pending)
+
         for j in range(replaceByGeneration):
-            # selects parent randomly
-            parent = selection(population)
+            if evaluator is None:
+                # selects parent randomly
+                offspring[j] = self.__makeOffspring(selection(population), True)[0]
 
-            offspring[j] = parent[0].crossover(parent[1], numberOfCrossoverPoints, crossoverProbability)
-            offspring[j].mutation(mutationSize, mutationProbability)
+            # clone has not been placed in population, unless it has been mutated to differ
+            if offspring[j] is None:
+                continue
 
             # replace chromosomes of current operation with offspring
             # select chromosome for replacement randomly
@@ -146,46 +233,69 @@ class GeneticAlgorithm:
 
             # try to add new chromosomes in best chromosome group
             self.addToBest(ci)
-        return offspring
+        return sum(child is not None for child in offspring)
 
     # Starts and executes algorithm
-    def run(self, maxRepeat=9999, minFitness=0.999):
-        # clear best chromosome group from previous execution
-        self.clearBest()
-        length_chromosomes = len(self._chromosomes)
-
-        self.initialize(self._chromosomes)
-        random.seed(round(time() * 1000))
-
-        # Current generation
-        currentGeneration = 0
-
-        repeat = 0
-        lastBestFit = 0.0
-
-        while 1:
-            best = self.result
-            print("Fitness:", "{:f}\t".format(best.fitness), "Generation:", currentGeneration, end="\r")
-
-            # algorithm has reached criteria?
-            if best.fitness > minFitness:
-                break
-
-            difference = abs(best.fitness - lastBestFit)
-            if difference <= 0.0000001:
-                repeat += 1
-            else:
-                repeat = 0
-
-            if repeat > (maxRepeat / 100):
-                random.seed(round(time() * 1000))
-                self.set_replace_by_generation(self._replaceByGeneration * 3)
-                self._crossoverProbability += 1
-
-            self.replacement(self._chromosomes, self._replaceByGeneration)
+    # When batchEvaluation is set, fitness of offspring is calculated for whole generation at once
+    def run(self, maxRepeat=9999, minFitness=0.999, batchEvaluation=False):
+        self._profiler.attach(self._prototype)
+        try:
+            self._observer.start()
+            # clear best chromosome group from previous execution
+            self.clearBest()
+            length_chromosomes = len(self._chromosomes)
+            self._evaluator = PopulationEvaluator(self._prototype.configuration) if batchEvaluation else None
+
+            with self._profiler.phase("initialize"):
+                self.initialize(self._chromosomes)
+            # Number of chromosomes whose fitness has been calculated
+            evaluations = length_chromosomes
+            random.seed(round(time() * 1000))
+
+            # Current generation
+            currentGeneration = 0
+
+            repeat = 0
+            lastBestFit = 0.0
+
+            while 1:
+                self._profiler.nextGeneration()
+                best = self.result
+                self._observer.notify(currentGeneration, best, evaluations)
+
+                # algorithm or another island has reached criteria?
+                if best.fitness > minFitness or (self._migration is not None and self._migration.stopped):
+                    break
 
-            lastBestFit = best.fitness
-            currentGeneration += 1
+                difference = abs(best.fitness - lastBestFit)
+                if difference <= 0.0000001:
+                    repeat += 1
+                else:
+                    repeat = 0
+
+                if repeat > (maxRepeat / 100):
+                    random.seed(round(time() * 1000))
+                    self.set_replace_by_generation(self._replaceByGeneration * 3)
+                    self._crossoverProbability += 1
+
+                with self._profiler.phase("replacement"):
+                    evaluations += self.replacement(self._chromosomes, self._replaceByGeneration)
+
+                if self._migration is not None:
+                    # chromosomes from other islands replace randomly chosen chromosomes which are not the best
+                    for immigrant in self._migration.exchange(currentGeneration, self._chromosomes):
+                        ci = randrange(32768) % length_chromosomes
+                        while self.isInBest(ci):
+                            ci = randrange(32768) % length_chromosomes
+                        self._chromosomes[ci] = immigrant
+                        self.addToBest(ci)
+
+                lastBestFit = best.fitness
+                currentGeneration += 1
+
+            self._observer.finish(currentGeneration, self.result, evaluations)
+        finally:
+            self._profiler.detach(self._prototype)
 
     def __str__(self):
         return "Genetic Algorithm"
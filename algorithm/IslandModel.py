@@ -0,0 +1,147 @@
+from .ExecutionBackend import _pack, _unpack
+from .Progress import ProgressObserver
+from model.Schedule import Schedule
+import heapq
+import multiprocessing
+import numpy as np
+import os
+import queue
+import random
+from time import time
+
+
+# Exchanges best chromosomes of one island with other islands
+class Migration:
+    def __init__(self, index, inboxes, stopEvent, topology="ring", migrationInterval=10, migrationSize=2):
+        # Index of island which owns this object
+        self._index = index
+        # Queues of chromosomes sent to each island
+        self._inboxes = inboxes
+        # Set when any island has reached criteria
+        self._stopEvent = stopEvent
+        # "ring" sends to next island, "random" sends to randomly chosen island
+        self._topology = topology
+        self._migrationInterval = max(1, migrationInterval)
+        self._migrationSize = migrationSize
+
+    @property
+    # Returns TRUE if any island has reached criteria
+    def stopped(self):
+        return self._stopEvent.is_set()
+
+    # Tells other islands to stop
+    def stop(self):
+        self._stopEvent.set()
+
+    # Returns index of island which receives chromosomes of this island
+    def target(self):
+        numberOfIslands = len(self._inboxes)
+        if self._topology == "random":
+            return (self._index + 1 + random.randrange(numberOfIslands - 1)) % numberOfIslands
+        return (self._index + 1) % numberOfIslands
+
+    # Sends best chromosomes of population to other island every migration interval
+    # and returns chromosomes received from other islands
+    def exchange(self, generation, population):
+        if generation == 0:
+            # run() seeds generators by clock, so islands started at the same time would repeat random numbers
+            seed = (os.getpid() * 7919 + int(time() * 1000)) % (2 ** 32)
+            random.seed(seed)
+            np.random.seed(seed)
+
+        if len(self._inboxes) < 2:
+            return []
+
+        if generation > 0 and generation % self._migrationInterval == 0:
+            emigrants = heapq.nlargest(self._migrationSize, population, key=lambda chromosome: chromosome.fitness)
+            self._inboxes[self.target()].put([_pack(chromosome) for chromosome in emigrants])
+
+        immigrants = []
+        inbox = self._inboxes[self._index]
+        while True:
+            try:
+                packed = inbox.get_nowait()
+            except queue.Empty:
+                break
+            immigrants.extend(_unpack(population[0], chromosome) for chromosome in packed)
+        return immigrants
+
+    # Island must not wait for chromosomes it has sent to be received when it exits
+    def close(self):
+        for inbox in self._inboxes:
+            inbox.cancel_join_thread()
+
+
+def _runIsland(index, algorithm, configuration, parameters, migration, maxRepeat, minFitness, results):
+    alg = algorithm(configuration, **parameters)
+    alg.migration = migration
+    # only first island shows its progress
+    if index > 0:
+        alg.observer = ProgressObserver()
+    alg.run(maxRepeat, minFitness)
+
+    best = alg.result
+    if best.fitness > minFitness:
+        migration.stop()
+    results.put((index, _pack(best)))
+    migration.close()
+
+
+# Runs independent populations of any algorithm in separate processes
+# Islands periodically send their best chromosomes to other islands,
+# and all of them stop when any island has reached criteria
+class IslandModel:
+    # Initializes island model, parameters are passed to constructor of algorithm
+    def __init__(self, configuration, algorithm, numberOfIslands=None, migrationInterval=10, migrationSize=2,
+                 topology="ring", **parameters):
+        if topology not in ("ring", "random"):
+            raise ValueError("Unknown topology: " + str(topology))
+
+        self._configuration = configuration
+        self._algorithm = algorithm
+        self._numberOfIslands = max(1, numberOfIslands or os.cpu_count())
+        self._migrationInterval, self._migrationSize = migrationInterval, migrationSize
+        self._topology = topology
+        self._parameters = parameters
+        # Best chromosome of all islands
+        self._best = None
+
+    @property
+    # Returns pointer to best chromosome of all islands
+    def result(self):
+        return self._best
+
+    # Starts islands and waits until all of them have finished
+    def run(self, maxRepeat=9999, minFitness=0.999):
+        numberOfIslands = self._numberOfIslands
+        inboxes = [multiprocessing.Queue() for _ in range(numberOfIslands)]
+        stopEvent, results = multiprocessing.Event(), multiprocessing.Queue()
+
+        islands = []
+        for i in range(numberOfIslands):
+            migration = Migration(i, inboxes, stopEvent, self._topology, self._migrationInterval, self._migrationSize)
+            island = multiprocessing.Process(target=_runIsland, args=(i, self._algorithm, self._configuration,
+                                                                      self._parameters, migration, maxRepeat,
+                                                                      minFitness, results))
+            island.start()
+            islands.append(island)
+
+        prototype = Schedule(self._configuration)
+        best = []
+        while len(best) < numberOfIslands:
+            try:
+                index, packed = results.get(timeout=1)
+            except queue.Empty:
+                # island has failed without sending its result?
+                if not any(island.is_alive() for island in islands):
+                    break
+                continue
+            best.append(_unpack(prototype, packed))
+
+        for island in islands:
+            island.join()
+
+        self._best = max(best, key=lambda chromosome: chromosome.fitness) if best else None
+
+    def __str__(self):
+        return "Island Model of " + self._algorithm.__name__
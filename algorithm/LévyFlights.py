@@ -1,48 +1,45 @@
+from .Swarm import Swarm
 import math
 import numpy as np
-import random
-from time import time
 
-class LévyFlights:
+class LévyFlights(Swarm):
     def __init__(self, chromlen):
+        super().__init__()
         self._chromlen, self._beta = chromlen, 1.5
         num = math.gamma(1 + self._beta) * math.sin(math.pi * self._beta / 2)
         den = math.gamma((1 + self._beta) / 2) * self._beta * (2 ** ((self._beta - 1) / 2))
         self._σu, self._σv = (num / den) ** (1 / self._beta), 1
 
 
-    def optimum(self, localVal, chromosome):
-        localBest = chromosome.makeEmptyFromPrototype()
-        localBest.updatePositions(localVal)
+    # Checks rows of positions of chromosomes at given indices of population at once
+    # Chromosome is replaced by the one decoded from its row of positions when that one dominates it
+    # Returns positions of the chromosomes after replacement
+    def optimums(self, positions, population, indices):
+        if len(indices) < 1:
+            return np.empty((0, self._chromlen), dtype=float)
 
-        if localBest.dominates(chromosome):
-            chromosome.updatePositions(localVal)
-            return localVal
-
-        positions = np.zeros(self._chromlen, dtype=float)
-        chromosome.extractPositions(positions)
+        evaluation, current = self.gather([population[i] for i in indices])
+        better, positions = self.accept(positions, evaluation, current)
+        self.replace(population, indices, evaluation, better)
         return positions
 
 
-    def updatePosition(self, chromosome, currentPosition, i, gBest):
-        curPos = np.copy(currentPosition[i])
-        u, v = np.random.randn() * self._σu, np.random.randn() * self._σv
-        S = u / (np.abs(v) ** (1 / self._beta))
-
-        if gBest is None:
-            gBest = np.zeros(self._chromlen, dtype=float)
-            chromosome.extractPositions(gBest)
-        else:
-            gBest = self.optimum(gBest, chromosome)
-
-        currentPosition[i] += np.random.normal(self._chromlen) * 0.01 * S * (curPos - gBest)
-        currentPosition[i] = self.optimum(currentPosition[i], chromosome)
-
-        return gBest
-
-
+    # Moves first chromosomes of population by Lévy flights from global best, each one to its new position
+    # when that one dominates it
+    # Step sizes are drawn for all chromosomes together, and new positions are decoded and evaluated as a batch
     def updatePositions(self, population, populationSize, currentPosition, gBest):
-        for i in range(populationSize):
-           gBest = self.updatePosition(population[i], currentPosition, i, gBest)
+        evaluation, positions = self.gather(population[: populationSize])
+        leaders, gBest, changed = self.lead(evaluation, positions, gBest)
+
+        # Mantegna's algorithm for all chromosomes at once
+        u = np.random.randn(populationSize) * self._σu
+        v = np.random.randn(populationSize) * self._σv
+        S = u / (np.abs(v) ** (1 / self._beta))
+        # one normally distributed factor for each chromosome, with mean equal to length of chromosome
+        step = np.random.normal(self._chromlen, size=populationSize) * 0.01 * S
 
+        curPos = currentPosition[: populationSize]
+        candidates = curPos + step[:, None] * (curPos - leaders)
+        better, currentPosition[: populationSize] = self.accept(candidates, evaluation, positions)
+        self.replace(population, range(populationSize), evaluation, changed | better)
         return gBest
@@ -0,0 +1,54 @@
+import numpy as np
+
+
+# Fast non-dominated sorting of population given as array of objectives, one row per chromosome
+# All objectives are minimized, row p dominates row q when it is not worse in any objective and better in one
+class NonDominatedSort:
+    # Number of rows compared with all others at once, limits memory of temporary arrays
+    BLOCK_SIZE = 256
+
+    # Returns matrix where element [p, q] is TRUE when row p dominates row q
+    @staticmethod
+    def dominanceMatrix(objectives):
+        objectives = np.asarray(objectives, dtype=float)
+        size = len(objectives)
+        # element [p, q] is TRUE when row p is not worse than row q in any objective
+        notWorse = np.empty((size, size), dtype=bool)
+        for start in range(0, size, NonDominatedSort.BLOCK_SIZE):
+            block = objectives[start: start + NonDominatedSort.BLOCK_SIZE, None, :]
+            notWorse[start: start + len(block)] = np.all(block <= objectives, axis=2)
+        # rows which are not worse than each other are equal
+        return notWorse & ~notWorse.T
+
+    # Returns index of front of each row, 0 for rows which are not dominated
+    @staticmethod
+    def ranks(objectives):
+        objectives = np.asarray(objectives, dtype=float)
+        if objectives.ndim == 1:
+            objectives = objectives[:, None]
+
+        # with one objective fronts are groups of equal values
+        if objectives.shape[1] == 1:
+            return np.unique(objectives[:, 0], return_inverse=True)[1].reshape(-1)
+
+        dominance = NonDominatedSort.dominanceMatrix(objectives)
+        # number of rows which dominate each row
+        dominatedBy = dominance.sum(axis=0)
+        ranks = np.full(len(objectives), -1)
+        front, rank = np.flatnonzero(dominatedBy == 0), 0
+        while front.size:
+            ranks[front] = rank
+            dominatedBy -= dominance[front].sum(axis=0)
+            dominatedBy[front] = -1
+            front, rank = np.flatnonzero(dominatedBy == 0), rank + 1
+        return ranks
+
+    # Returns list of fronts, each of them is array of indices of rows in ascending order
+    @staticmethod
+    def fronts(objectives):
+        ranks = NonDominatedSort.ranks(objectives)
+        if ranks.size == 0:
+            return []
+        order = np.argsort(ranks, kind="stable")
+        bounds = np.flatnonzero(np.diff(ranks[order])) + 1
+        return np.split(order, bounds)
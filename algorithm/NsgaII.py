@@ -1,4 +1,7 @@
 from model.Schedule import Schedule
+from .NonDominatedSort import NonDominatedSort
+from .Profiler import NullProfiler
+from .Progress import ConsoleProgress
 import numpy as np
 import random
 import sys
@@ -24,6 +27,12 @@ class NsgaII:
         self._chromosomes = []
         self._populationSize = numberOfChromosomes
         self._repeatRatio = .0
+        # Exchanges chromosomes with other islands, used by island model
+        self._migration = None
+        # Measures time of phases of algorithm, does nothing unless profiling is enabled
+        self._profiler = NullProfiler()
+        # Notified about progress in each generation, shows it in console by default
+        self._observer = ConsoleProgress()
 
     # Initializes genetic algorithm
     def __init__(self, configuration, numberOfCrossoverPoints=2, mutationSize=2, crossoverProbability=80,
@@ -39,36 +48,41 @@ class NsgaII:
     def result(self):
         return self._chromosomes[0]
 
-    # non-dominated sorting function
+    @property
+    # Returns object which exchanges chromosomes with other populations of island model
+    def migration(self):
+        return self._migration
+
+    @migration.setter
+    def migration(self, migration):
+        self._migration = migration
+
+    @property
+    # Returns profiler which measures time of phases of algorithm
+    def profiler(self):
+        return self._profiler
+
+    @profiler.setter
+    # Sets Profiler to measure phases of algorithm, or NullProfiler to disable measuring
+    def profiler(self, profiler):
+        self._profiler = profiler
+
+    @property
+    # Returns observer which is notified about progress of algorithm
+    def observer(self):
+        return self._observer
+
+    @observer.setter
+    # Sets observer of progress, e.g. ConsoleProgress or silent ProgressObserver
+    def observer(self, observer):
+        self._observer = observer
+
+    # non-dominated sorting function, chromosome with higher fitness dominates
+    # Returns fronts as lists of indices of chromosomes
     def nonDominatedSorting(self, totalChromosome):
-        doublePopulationSize = self._populationSize * 2
-        s = doublePopulationSize * [ set() ]
-        n = np.zeros(doublePopulationSize, dtype=int)
-        front = [ set() ]
-
-        for p in range(doublePopulationSize):
-            for q in range(doublePopulationSize):
-                if totalChromosome[p].fitness > totalChromosome[q].fitness:
-                    s[p].add(q)
-                elif totalChromosome[p].fitness < totalChromosome[q].fitness:
-                    n[p] += 1
-
-            if n[p] == 0:
-                front[0].add(p)
-    
-        i = 0
-        while front[i]:
-            Q = set()
-            for p in front[i]:
-                for q in s[p]:
-                    n[q] -= 1
-                    if n[q] == 0:
-                        Q.add(q)
-            i += 1
-            front.append(Q)
-
-        front.pop()
-        return front
+        fitness = np.fromiter((chromosome.fitness for chromosome in totalChromosome), dtype=float,
+                              count=len(totalChromosome))
+        return [front.tolist() for front in NonDominatedSort.fronts(-fitness)]
 
     # calculate crowding distance function
     def calculateCrowdingDistance(self, front, totalChromosome):
@@ -151,72 +165,92 @@ class NsgaII:
 
     # Starts and executes algorithm
     def run(self, maxRepeat=9999, minFitness=0.999):
-        mutationSize = self._mutationSize
-        mutationProbability = self._mutationProbability
-        nonDominatedSorting = self.nonDominatedSorting
-        selection = self.selection
-        populationSize = self._populationSize
-        population = populationSize * [None]
-
-        self.initialize(population)
-        random.seed(round(time() * 1000))
-        np.random.seed(int(time()))
-
-        # Current generation
-        currentGeneration = 0
-
-        repeat = 0
-        lastBestFit = 0.0
-
-        while 1:
-            if currentGeneration > 0:
-                best = self.result
-                print("Fitness:", "{:f}\t".format(best.fitness), "Generation:", currentGeneration, end="\r")
-
-                # algorithm has reached criteria?
-                if best.fitness > minFitness:
+        self._profiler.attach(self._prototype)
+        try:
+            self._observer.start()
+            mutationSize = self._mutationSize
+            mutationProbability = self._mutationProbability
+            nonDominatedSorting = self.nonDominatedSorting
+            selection = self.selection
+            populationSize = self._populationSize
+            population = populationSize * [None]
+
+            with self._profiler.phase("initialize"):
+                self.initialize(population)
+            # Number of chromosomes whose fitness has been calculated
+            evaluations = populationSize
+            random.seed(round(time() * 1000))
+            np.random.seed(int(time()))
+
+            # Current generation
+            currentGeneration = 0
+
+            repeat = 0
+            lastBestFit = 0.0
+
+            while 1:
+                self._profiler.nextGeneration()
+                if currentGeneration > 0:
+                    best = self.result
+                    self._observer.notify(currentGeneration, best, evaluations)
+
+                    # algorithm or another island has reached criteria?
+                    if best.fitness > minFitness or (self._migration is not None and self._migration.stopped):
+                        break
+
+                    difference = abs(best.fitness - lastBestFit)
+                    if difference <= 0.0000001:
+                        repeat += 1
+                    else:
+                        repeat = 0
+
+                    self._repeatRatio = repeat * 100 / maxRepeat
+                    if repeat > (maxRepeat / 100):
+                        self.reform()
+
+                # crossover
+                with self._profiler.phase("replacement"):
+                    offspring = self.replacement(population)
+
+                # mutation
+                with self._profiler.phase("mutation"):
+                    for child in offspring:
+                        child.mutation(mutationSize, mutationProbability)
+                evaluations += len(offspring)
+
+                if self._migration is not None:
+                    offspring.extend(self._migration.exchange(currentGeneration, population))
+
+                totalChromosome = population + offspring
+
+                # non-dominated sorting
+                with self._profiler.phase("nonDominatedSorting"):
+                    front = nonDominatedSorting(totalChromosome)
+                if len(front) == 0:
                     break
 
-                difference = abs(best.fitness - lastBestFit)
-                if difference <= 0.0000001:
-                    repeat += 1
-                else:
-                    repeat = 0
-
-                self._repeatRatio = repeat * 100 / maxRepeat
-                if repeat > (maxRepeat / 100):
-                    self.reform()
-
-            # crossover
-            offspring = self.replacement(population)
+                # selection
+                with self._profiler.phase("selection"):
+                    population = selection(front, totalChromosome)
+                self._populationSize = populationSize = len(population)
 
-            # mutation
-            for child in offspring:
-                child.mutation(mutationSize, mutationProbability)
-
-            totalChromosome = population + offspring
-
-            # non-dominated sorting
-            front = nonDominatedSorting(totalChromosome)
-            if len(front) == 0:
-                break
-
-            # selection
-            population = selection(front, totalChromosome)
-            self._populationSize = populationSize = len(population)
-
-            # comparison
-            if currentGeneration == 0:
-                self._chromosomes = population
-            else:
-                totalChromosome = population + self._chromosomes
-                newBestFront = nonDominatedSorting(totalChromosome)
-                if len(newBestFront) == 0:
-                    break
-                self._chromosomes = selection(newBestFront, totalChromosome)
-                lastBestFit = best.fitness
-
-            currentGeneration += 1
+                # comparison
+                if currentGeneration == 0:
+                    self._chromosomes = population
+                else:
+                    totalChromosome = population + self._chromosomes
+                    with self._profiler.phase("nonDominatedSorting"):
+                        newBestFront = nonDominatedSorting(totalChromosome)
+                    if len(newBestFront) == 0:
+                        break
+                    self._chromosomes = selection(newBestFront, totalChromosome)
+                    lastBestFit = best.fitness
+
+                currentGeneration += 1
+
+            self._observer.finish(currentGeneration, self.result, evaluations)
+        finally:
+            self._profiler.detach(self._prototype)
             
     def __str__(self):
         return "NSGA II"
@@ -1,6 +1,12 @@
+from model.PopulationEvaluator import PopulationEvaluator
 from model.Schedule import Schedule
-import concurrent.futures
+from .ExecutionBackend import ThreadBackend
+from .NonDominatedSort import NonDominatedSort
+from .Profiler import NullProfiler
+from .Progress import ConsoleProgress
+import itertools
 import numpy as np
+import random
 import sys
 from numpy.random import randint as randrange
 from time import time
@@ -24,6 +30,18 @@ class NsgaIII:
         # Best of chromosomes
         self._best = None
         self._populationSize = numberOfChromosomes
+        # Evaluates whole population at once, used when batch evaluation is chosen
+        self._evaluator = None
+        # Executes crossover, mutation and initialization of population
+        self._backend = ThreadBackend()
+        # Exchanges chromosomes with other islands, used by island model
+        self._migration = None
+        # Measures time of phases of algorithm, does nothing unless profiling is enabled
+        self._profiler = NullProfiler()
+        # Notified about progress in each generation, shows it in console by default
+        self._observer = ConsoleProgress()
+        # Removes or mutates clones among offspring, disabled by default
+        self._deduplication = None
 
     # Initializes genetic algorithm
     def __init__(self, configuration, numberOfCrossoverPoints=2, mutationSize=2, crossoverProbability=80,
@@ -46,247 +64,180 @@ class NsgaIII:
     def result(self):
         return self._best
 
+    @property
+    # Returns backend which executes genetic operations of population
+    def backend(self):
+        return self._backend
 
-    class ReferencePoint:
-        def __init__(self, M):
-            self.memberSize = 0
-            self.position = np.zeros(M)
-            self._potentialMembers = {}
-
-        def addMember(self):
-            self.memberSize += 1
-
-        def addPotentialMember(self, memberInd, distance):
-            currDistance = self._potentialMembers.get(memberInd)
-            if currDistance is None or distance < currDistance:
-                self._potentialMembers[memberInd] = distance
-
-        def findClosestMember(self):
-            minDist, minIndv = sys.float_info.max, -1
-            for k, v in self._potentialMembers.items():
-                if v < minDist:
-                    minDist, minIndv = v, k
-            return minIndv
-
-        def hasPotentialMember(self):
-            return bool(self._potentialMembers)
-
-        def randomMember(self):
-            if not self.hasPotentialMember():
-                return -1
-
-            members = list(self._potentialMembers.keys())
-            return members[randrange(len(self._potentialMembers))]
-
-        def removePotentialMember(self, memberInd):
-            while memberInd in self._potentialMembers:
-                del self._potentialMembers[memberInd]
-
-        @staticmethod
-        def generateReferencePoints(rps, M, p):
-            def generateRecursive(rps, pt, numObjs, left, total, element):
-                if element == numObjs - 1:
-                    pt.position[element] = left / total
-                    rps.append(pt)
-                else:
-                    for i in range(left + 1):
-                        pt.position[element] = i / total
-                        generateRecursive(rps, pt, numObjs, left - i, total, element + 1)
-                    
-            pt = NsgaIII.ReferencePoint(M)
-            generateRecursive(rps, pt, M, p[0], p[0], 0)
-
-            if len(p) > 1: # two layers of reference points (Check Fig. 4 in NSGA-III paper)
-                insideRps = []
-                generateRecursive(insideRps, pt, M, p[1], p[1], 0)
-
-                center = 1.0 / M
-                for insideRp in insideRps:
-                    for j, pos in enumerate(insideRp.position):
-                        insideRp.position[j] = center + pos / 2
-
-                    rps.append(insideRp)
-
-
-
-    def perpendicularDistance(self, direction, point):
-        numerator, denominator = np.sum(direction * point), np.sum(direction ** 2)
-
-        if denominator <= 0:
-            return sys.float_info.max
-
-        k = numerator / denominator
-        d = np.sum((k * direction - point) ** 2)
-        return np.sqrt(d)
-
-    def associate(self, rps, pop, fronts):
-        for t, front in enumerate(fronts):
-            for memberInd in front:
-                minRp, minDist = len(rps) - 1, sys.float_info.max
-                for r, rp in enumerate(rps):
-                    d = self.perpendicularDistance(rp.position, pop[memberInd].convertedObjectives)
-                    if d < minDist:
-                        minRp, minDist = r, d
-
-                if t + 1 != len(fronts):
-                    rps[minRp].addMember()
-                else:
-                    rps[minRp].addPotentialMember(memberInd, minDist)
-
-
-    # ASF: Achivement Scalarization Function
-    def ASF(self, objs, weight):
-        max_ratio = -sys.float_info.max
-        for f, obj in enumerate(objs):
-            w = max(weight[f], 1e-6)
-            max_ratio = max(max_ratio, obj / w)
-
-        return max_ratio
-
-    def findExtremePoints(self, pop, fronts):
-        numObj = len(pop[0].objectives)
-
-        exp = []
-        for f in range(numObj):
-            w = np.full(numObj, 1e-6)
-            w[f] = 1.0
-
-            minASF, minIndv = sys.float_info.max, len(fronts[0])
-
-            for frontIndv in fronts[0]:
-                asf = self.ASF(pop[frontIndv].convertedObjectives, w)
+    @backend.setter
+    # Sets backend: SerialBackend, ThreadBackend or ProcessBackend
+    def backend(self, new_backend):
+        self._backend.shutdown()
+        self._backend = new_backend
+        self._backend.profiler = self._profiler
 
-                if asf < minASF:
-                    minASF, minIndv = asf, frontIndv
+    @property
+    # Returns object which exchanges chromosomes with other populations of island model
+    def migration(self):
+        return self._migration
 
-            exp.append(minIndv)
+    @migration.setter
+    def migration(self, migration):
+        self._migration = migration
 
-        return exp
+    @property
+    # Returns profiler which measures time of phases of algorithm
+    def profiler(self):
+        return self._profiler
 
-    def findMaxObjectives(self, pop):
-        numObj = len(pop[0].objectives)
-        maxPoint = np.full(numObj, -sys.float_info.max)
-        for chromosome in pop:
-            for f, point in enumerate(maxPoint):
-                maxPoint[f] = max(point, chromosome.objectives[f])
+    @profiler.setter
+    # Sets Profiler to measure phases of algorithm, or NullProfiler to disable measuring
+    def profiler(self, profiler):
+        self._profiler = profiler
+        self._backend.profiler = profiler
 
-        return maxPoint
+    @property
+    # Returns observer which is notified about progress of algorithm
+    def observer(self):
+        return self._observer
 
-    def findNicheReferencePoint(self, rps):
-        # find the minimal cluster size
-        minSize = sys.float_info.max
-        for rp in rps:
-            minSize = min(minSize, rp.memberSize)
+    @observer.setter
+    # Sets observer of progress, e.g. ConsoleProgress or silent ProgressObserver
+    def observer(self, observer):
+        self._observer = observer
 
-        # find the reference points with the minimal cluster size Jmin
-        min_rps = []
-        for r, rp in enumerate(rps):
-            if rp.memberSize == minSize:
-                min_rps.append(r)
+    @property
+    # Returns stage which removes or mutates offspring identical to other chromosomes, None when it is disabled
+    def deduplication(self):
+        return self._deduplication
+
+    @deduplication.setter
+    # Sets Deduplication run on offspring before they enter population, or None to disable it
+    def deduplication(self, deduplication):
+        self._deduplication = deduplication
+
+
+    # Reference directions already generated, for each number of objectives and divisions
+    _referencePoints = {}
+
+    # Returns reference directions on simplex of M objectives, divided p[0] times on each objective
+    # Second layer of points inside simplex is added when p has two elements (Check Fig. 4 in NSGA-III paper)
+    # Directions are generated once and shared by all populations, they must not be changed
+    @staticmethod
+    def referencePoints(M, p):
+        key = (M, tuple(p))
+        rps = NsgaIII._referencePoints.get(key)
+        if rps is not None:
+            return rps
+
+        def generateLayer(total):
+            # every way to split total into M parts, parts are differences of positions of M - 1 bars
+            combinations = list(itertools.combinations(range(total + M - 1), M - 1))
+            bars = np.array(combinations, dtype=int).reshape(len(combinations), M - 1)
+            bounds = np.hstack((np.full((len(bars), 1), -1), bars, np.full((len(bars), 1), total + M - 1)))
+            return (np.diff(bounds, axis=1) - 1) / total
+
+        rps = generateLayer(p[0])
+        if len(p) > 1:
+            rps = np.vstack((rps, 1.0 / M + generateLayer(p[1]) / 2))
+
+        rps.setflags(write=False)
+        NsgaIII._referencePoints[key] = rps
+        return rps
+
+
+    # Returns matrix of distances of each point to each reference line given by direction
+    def perpendicularDistances(self, directions, points):
+        numerator, denominator = points @ directions.T, np.sum(directions ** 2, axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # squared length of point minus squared length of its projection on line
+            d = np.sum(points ** 2, axis=1)[:, None] - numerator ** 2 / denominator
+        distances = np.sqrt(np.maximum(d, 0))
+        distances[:, denominator <= 0] = sys.float_info.max
+        return distances
+
+    # Returns number of members of each reference point from all fronts but the last,
+    # and nearest reference point and distance to it of each individual of the last front
+    def associate(self, rps, convertedObjectives, fronts):
+        members = np.concatenate(fronts)
+        distances = self.perpendicularDistances(rps, convertedObjectives[members])
+        nearest = np.argmin(distances, axis=1)
+        minDistances = distances[np.arange(len(members)), nearest]
+
+        lastFrontStart = len(members) - len(fronts[-1])
+        memberSize = np.bincount(nearest[: lastFrontStart], minlength=len(rps))
+        return memberSize, nearest[lastFrontStart:], minDistances[lastFrontStart:]
+
+
+    # ASF: Achivement Scalarization Function, calculated for each row of objectives and each row of weights
+    def ASF(self, objs, weights):
+        return np.max(objs[:, None, :] / np.maximum(weights, 1e-6), axis=2)
+
+    def findExtremePoints(self, convertedObjectives, fronts):
+        numObj = convertedObjectives.shape[1]
+        weights = np.full((numObj, numObj), 1e-6)
+        np.fill_diagonal(weights, 1.0)
+
+        firstFront = np.asarray(fronts[0])
+        asf = self.ASF(convertedObjectives[firstFront], weights)
+        return firstFront[np.argmin(asf, axis=0)].tolist()
+
+    def findMaxObjectives(self, objectives):
+        return np.max(objectives, axis=0)
+
+    # Returns random reference point with the minimal cluster size Jmin among points which are not disregarded
+    def findNicheReferencePoint(self, memberSize, active):
+        minSize = np.min(memberSize[active])
+        min_rps = np.flatnonzero(active & (memberSize == minSize))
 
         # return a random reference point (j-bar)
         return min_rps[randrange(len(min_rps))]
 
-    def constructHyperplane(self, pop, extremePoints):
-        numObj = len(pop[0].objectives)
+    def constructHyperplane(self, objectives, convertedObjectives, extremePoints):
         # Check whether there are duplicate extreme points.
         # This might happen but the original paper does not mention how to deal with it.
-        duplicate = False
-        for i, extremePoint in enumerate(extremePoints):
-            if duplicate:
-                break
-            for j in range(i + 1, len(extremePoints)):
-                if duplicate:
-                    break
-                duplicate = (extremePoint == extremePoints[j])
-
-        intercepts, negativeIntercept = [], False
-        if not duplicate:
+        if len(set(extremePoints)) == len(extremePoints):
             # Find the equation of the hyperplane
-            b, A = np.ones(numObj), [pop[extremePt].convertedObjectives for extremePt in extremePoints]
-            x = np.linalg.solve(A, b)
+            try:
+                x = np.linalg.solve(convertedObjectives[extremePoints], np.ones(len(extremePoints)))
+            except np.linalg.LinAlgError:
+                x = None
 
             # Find intercepts
-            for f in range(numObj):
-                intercepts.append(1.0 / x[f])
-
-                if x[f] < 0:
-                    negativeIntercept = True
-                    break
-
-        if duplicate or negativeIntercept: # follow the method in Yuan et al. (GECCO 2015)
-            intercepts = self.findMaxObjectives(pop)
+            if x is not None and np.all(x >= 0):
+                with np.errstate(divide="ignore"):
+                    return 1.0 / x
 
-        return intercepts
+        # follow the method in Yuan et al. (GECCO 2015)
+        return self.findMaxObjectives(objectives)
 
 
-    def normalizeObjectives(self, pop, fronts, intercepts, idealPoint):
-        for front in fronts:
-            for i, ind in enumerate(front):
-                convObjs = pop[ind].convertedObjectives
-                convObjs /= intercepts - idealPoint + np.finfo(float).eps
+    def normalizeObjectives(self, convertedObjectives, intercepts, idealPoint):
+        convertedObjectives /= intercepts - idealPoint + np.finfo(float).eps
 
 
-    def nondominatedSort(self, pop):
-        numAssignedIndividuals, rank = 0, 1
-        fronts, indvRanks = [], np.zeros(len(pop))
+    def nondominatedSort(self, objectives):
+        return [front.tolist() for front in NonDominatedSort.fronts(objectives)]
 
-        while numAssignedIndividuals < len(pop):
-            curFront = []
+    # Returns index of potential member of reference point in the last front
+    def selectClusterMember(self, r, memberSize, nearest, distances, available):
+        potentialMembers = np.flatnonzero(available & (nearest == r))
+        if memberSize[r] == 0: # currently has no member
+            return potentialMembers[np.argmin(distances[potentialMembers])]
 
-            for i, chromosome in enumerate(pop):
-                if indvRanks[i] > 0:
-                    continue # already assigned a rank
+        return potentialMembers[randrange(len(potentialMembers))]
 
-                be_dominated = False
-                for j, front in enumerate(curFront):
-                    if pop[front].dominates(chromosome):
-                        be_dominated = True
-                        break
-                    elif chromosome.dominates(pop[front]):
-                        del curFront[j]
-
-                if not be_dominated:
-                    curFront.append(i)
-
-            for front in curFront:
-                indvRanks[front] = rank
-
-            fronts.append(curFront)
-            numAssignedIndividuals += len(curFront)
-
-            rank += 1
-
-        return fronts
-
-    def selectClusterMember(self, rp):
-        if rp.hasPotentialMember():
-            if rp.memberSize == 0: # currently has no member
-                return rp.findClosestMember()
-
-            return rp.randomMember()
-
-        return -1
-
-    def translateObjectives(self, pop, fronts):
-        idealPoint, numObj = [], len(pop[0].objectives)
-        for f in range(numObj):
-            minf = sys.float_info.max
-            for frontIndv in fronts[0]: # min values must appear in the first front
-                minf = min(minf, pop[frontIndv].objectives[f])
-
-            idealPoint.append(minf)
-
-            for front in fronts:
-                for ind in front:
-                    pop[ind].resizeConvertedObjectives(numObj)
-                    pop[ind].convertedObjectives[f] = pop[ind].objectives[f] - minf
-
-        return idealPoint
+    # min values must appear in the first front
+    def translateObjectives(self, objectives, fronts):
+        idealPoint = np.min(objectives[fronts[0]], axis=0)
+        return objectives - idealPoint, idealPoint
 
     def selection(self, cur, rps):
+        objectives = np.array([chromosome.objectives for chromosome in cur], dtype=float)
+
         # ---------- Step 4 in Algorithm 1: non-dominated sorting ----------
-        fronts = self.nondominatedSort(cur)
+        with self._profiler.phase("nondominatedSort"):
+            fronts = self.nondominatedSort(objectives)
 
         # ---------- Steps 5-7 in Algorithm 1 ----------
         last, next_size = 0, 0
@@ -304,28 +255,35 @@ class NsgaIII:
             return next
 
         # ---------- Step 14 / Algorithm 2 ----------
-        idealPoint = self.translateObjectives(cur, fronts)
+        with self._profiler.phase("normalize"):
+            convertedObjectives, idealPoint = self.translateObjectives(objectives, fronts)
 
-        extremePoints = self.findExtremePoints(cur, fronts)
+            extremePoints = self.findExtremePoints(convertedObjectives, fronts)
 
-        intercepts = self.constructHyperplane(cur, extremePoints)
+            intercepts = self.constructHyperplane(objectives, convertedObjectives, extremePoints)
 
-        self.normalizeObjectives(cur, fronts, intercepts, idealPoint)
+            self.normalizeObjectives(convertedObjectives, intercepts, idealPoint)
 
         # ---------- Step 15 / Algorithm 3, Step 16 ----------
-        self.associate(rps, cur, fronts)
+        with self._profiler.phase("associate"):
+            memberSize, nearest, distances = self.associate(rps, convertedObjectives, fronts)
 
         # ---------- Step 17 / Algorithm 4 ----------
-        while len(next) < self._populationSize:
-            minRp = self.findNicheReferencePoint(rps)
-
-            chosen = self.selectClusterMember(rps[minRp])
-            if chosen < 0: # no potential member in Fl, disregard this reference point
-                del rps[minRp]
-            else:
-                rps[minRp].addMember()
-                rps[minRp].removePotentialMember(chosen)
-                next.append(cur[chosen])
+        with self._profiler.phase("niching"):
+            lastFront = fronts[-1]
+            # reference points without potential member in Fl are disregarded at once
+            potentialSize = np.bincount(nearest, minlength=len(rps))
+            active, available = potentialSize > 0, np.ones(len(lastFront), dtype=bool)
+            while len(next) < self._populationSize:
+                minRp = self.findNicheReferencePoint(memberSize, active)
+
+                chosen = self.selectClusterMember(minRp, memberSize, nearest, distances, available)
+                memberSize[minRp] += 1
+                available[chosen] = False
+                potentialSize[minRp] -= 1
+                if potentialSize[minRp] == 0:
+                    active[minRp] = False
+                next.append(cur[lastFront[chosen]])
 
         return next
 
@@ -333,40 +291,19 @@ class NsgaIII:
     def crossing(self, population):
         populationSize = self._populationSize
         crossoverProbability, numberOfCrossoverPoints = self._crossoverProbability, self._numberOfCrossoverPoints
-        offspring = []
-
-        def crossover(population):
-            father = population[randrange(populationSize)]
-            mother = population[randrange(populationSize)]
-            child0 = father.crossover(mother, numberOfCrossoverPoints, crossoverProbability)
-            child1 = mother.crossover(father, numberOfCrossoverPoints, crossoverProbability)
-            return (child0, child1)
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-            futures = [executor.submit(crossover, population) for _ in range(0, populationSize, 2)]
-            for future in concurrent.futures.as_completed(futures):
-                # append child chromosome to offspring list
-                offspring.extend(future.result())
-
-        return offspring
-
-    def makeNew(self, x):
-        return self._prototype.makeNewFromPrototype()
+        # select parents randomly
+        pairs = [(population[randrange(populationSize)], population[randrange(populationSize)])
+                 for _ in range(0, populationSize, 2)]
+        return self._backend.crossover(pairs, numberOfCrossoverPoints, crossoverProbability, self._evaluator is None)
 
     # initialize new population with chromosomes randomly built using prototype
     def initialize(self):
-        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-            result = [executor.map(self.makeNew, range(self._populationSize))]
-        return result
+        return self._backend.initialize(self._prototype, self._populationSize, self._evaluator is None)
 
 
     def mutation(self, population):
-        def mutate(chromosome):
-            return chromosome.mutation(self._mutationSize, self._mutationProbability)
-
-        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-                for i in range(len(population)):
-                    executor.submit(mutate, population[i])
+        self._backend.mutation(population, self._mutationSize, self._mutationProbability, self._evaluator is None)
 
     def reform(self):
         random.seed(round(time() * 1000))
@@ -377,57 +314,95 @@ class NsgaIII:
             self._mutationProbability += 1.0
 
     def replacement(self, population):
-        rps = []
-        self.ReferencePoint.generateReferencePoints(rps, len(population[0].objectives), self._objDivision)
+        rps = self.referencePoints(len(population[0].objectives), self._objDivision)
         return self.selection(population, rps)
 
     # Starts and executes algorithm
-    def run(self, maxRepeat=9999, minFitness=0.999):
-        population = self.initialize()
-        random.seed(round(time() * 1000))
-        np.random.seed(int(time()))
-        pop = [population, None]
-
-        # Current generation
-        currentGeneration = 0
-
-        bestNotEnhance = 0
-        lastBestFit = 0.0
-
-        cur, next = 0, 1
-        while 1:
-            if currentGeneration > 0:
-                best = self.result
-                print("Fitness:", "{:f}\t".format(best.fitness), "Generation:", currentGeneration, end="\r")
-
-                # algorithm has reached criteria?
-                if best.fitness > minFitness:
-                    break
-
-                difference = abs(best.fitness - lastBestFit)
-                if difference <= 0.0000001:
-                    bestNotEnhance += 1
-                else:
-                    lastBestFit = best.fitness
-                    bestNotEnhance = 0
-
-                if bestNotEnhance > (maxRepeat / 50):
-                    self.reform()
-
-            # crossover
-            offspring = self.crossing(pop[cur])
-
-            # mutation
-            self.mutation(offspring)
-
-            pop[cur].extend(offspring)
-
-            # replacement
-            pop[next] = self.replacement(pop[cur])
-            self._best = pop[next][0] if pop[next][0].dominates(pop[cur][0]) else pop[cur][0]
+    # When batchEvaluation is set, fitness of offspring is calculated for whole generation at once
+    def run(self, maxRepeat=9999, minFitness=0.999, batchEvaluation=False):
+        self._profiler.attach(self._prototype)
+        try:
+            self._observer.start()
+            # with deduplication offspring are evaluated at once too, after clones have been removed
+            batchEvaluation = batchEvaluation or self._deduplication is not None
+            self._evaluator = evaluator = PopulationEvaluator(self._prototype.configuration) if batchEvaluation else None
+            with self._profiler.phase("initialize"):
+                population = self.initialize()
+            # Number of chromosomes whose fitness has been calculated
+            evaluations = len(population)
+            if evaluator is not None:
+                evaluator.evaluatePopulation(population)
+            random.seed(round(time() * 1000))
+            np.random.seed(int(time()))
+            pop = [population, None]
+
+            # Current generation
+            currentGeneration = 0
+
+            bestNotEnhance = 0
+            lastBestFit = 0.0
+
+            cur, next = 0, 1
+            while 1:
+                self._profiler.nextGeneration()
+                if currentGeneration > 0:
+                    best = self.result
+                    self._observer.notify(currentGeneration, best, evaluations)
+
+                    # algorithm or another island has reached criteria?
+                    if best.fitness > minFitness or (self._migration is not None and self._migration.stopped):
+                        break
 
-            cur, next = next, cur
-            currentGeneration += 1
+                    difference = abs(best.fitness - lastBestFit)
+                    if difference <= 0.0000001:
+                        bestNotEnhance += 1
+                    else:
+                        lastBestFit = best.fitness
+                        bestNotEnhance = 0
+
+                    if bestNotEnhance > (maxRepeat / 50):
+                        self.reform()
+
+                # crossover
+                with self._profiler.phase("crossing"):
+                    offspring = self.crossing(pop[cur])
+
+                # mutation
+                with self._profiler.phase("mutation"):
+                    self.mutation(offspring)
+
+                # clones of chromosomes in population would take its places, they are removed before evaluation
+                pending = offspring
+                if self._deduplication is not None:
+                    # parents which have not been crossed are shared with population and they may have been mutated
+                    members = {id(chromosome) for chromosome in pop[cur]}
+                    pending = list({id(chromosome): chromosome for chromosome in offspring
+                                    if id(chromosome) in members}.values())
+                    offspring = self._deduplication.apply(offspring, pop[cur], False)
+                    pending += offspring
+
+                if evaluator is not None:
+                    with self._profiler.phase("evaluation"):
+                        evaluator.evaluatePopulation(pending)
+                evaluations += len(pending)
+
+                if self._migration is not None:
+                    offspring.extend(self._migration.exchange(currentGeneration, pop[cur]))
+
+                pop[cur].extend(offspring)
+
+                # replacement
+                with self._profiler.phase("replacement"):
+                    pop[next] = self.replacement(pop[cur])
+                self._best = pop[next][0] if pop[next][0].dominates(pop[cur][0]) else pop[cur][0]
+
+                cur, next = next, cur
+                currentGeneration += 1
+
+            self._observer.finish(currentGeneration, self.result, evaluations)
+        finally:
+            self._backend.shutdown()
+            self._profiler.detach(self._prototype)
 
     def __str__(self):
         return "NSGA III"
@@ -0,0 +1,158 @@
+import json
+import os
+import threading
+from time import perf_counter
+
+
+# Measures one phase, used as context manager
+class _Phase:
+    __slots__ = ("_profiler", "_name", "_start")
+
+    def __init__(self, profiler, name):
+        self._profiler, self._name = profiler, name
+
+    def __enter__(self):
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self._profiler.add(self._name, perf_counter() - self._start, self._start)
+
+
+# Does nothing, used by algorithms when profiling is disabled
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+# Profiler used when profiling is disabled, its methods do nothing
+class NullProfiler:
+    _PHASE = _NullPhase()
+
+    def phase(self, name):
+        return self._PHASE
+
+    def add(self, name, seconds, start=None, pid=None, tid=None):
+        pass
+
+    def nextGeneration(self):
+        pass
+
+    def attach(self, prototype):
+        pass
+
+    def detach(self, prototype):
+        pass
+
+
+# Accumulates wall time and number of calls of each phase of algorithm, in total and per generation
+# Phases may be nested, e.g. calculateFitness is measured inside crossing, so their times overlap
+# When trace is set, each phase and generation is also recorded as span of Chrome Trace Event format
+class Profiler(NullProfiler):
+    def __init__(self, trace=False):
+        # Seconds and calls of each phase
+        self._totals = {}
+        # Seconds of each phase in each generation
+        self._generations = []
+        self._lock = threading.Lock()
+        # Trace events, None when trace is not recorded
+        self._events = [] if trace else None
+        self._origin = perf_counter()
+        self._generationStart = None
+
+    # Returns context manager which measures phase
+    def phase(self, name):
+        return _Phase(self, name)
+
+    # Adds time of one call of phase which has started at given value of perf_counter
+    # Phases measured in other processes or threads are identified by pid and tid
+    def add(self, name, seconds, start=None, pid=None, tid=None):
+        with self._lock:
+            if self._events is not None and start is not None:
+                self.addEvent(name, start, seconds, pid, tid)
+            total = self._totals.get(name)
+            if total is None:
+                total = self._totals[name] = [0.0, 0]
+            total[0] += seconds
+            total[1] += 1
+            if self._generations:
+                generation = self._generations[-1]
+                generation[name] = generation.get(name, 0.0) + seconds
+
+    # Appends span to trace, lock must be held by caller
+    def addEvent(self, name, start, seconds, pid=None, tid=None):
+        self._events.append({"name": name, "ph": "X", "ts": (start - self._origin) * 1e6, "dur": seconds * 1e6,
+                             "pid": os.getpid() if pid is None else pid,
+                             "tid": threading.get_ident() if tid is None else tid})
+
+    # Ends span of current generation in trace
+    def __endGeneration(self):
+        if self._events is not None and self._generationStart is not None:
+            now = perf_counter()
+            self.addEvent("Generation " + str(len(self._generations) - 1), self._generationStart,
+                          now - self._generationStart)
+            self._generationStart = None
+
+    # Starts measuring next generation
+    def nextGeneration(self):
+        with self._lock:
+            self.__endGeneration()
+            self._generations.append({})
+            self._generationStart = perf_counter()
+
+    # Measures fitness calculation of prototype and all chromosomes made from it, until detach is called
+    # Only chromosomes of one algorithm are measured, so profilers of other algorithms are not affected
+    def attach(self, prototype):
+        prototype.profiler = self
+
+    # Stops measuring chromosomes made from prototype, which are made after this call
+    def detach(self, prototype):
+        with self._lock:
+            self.__endGeneration()
+        if prototype.profiler is self:
+            prototype.profiler = None
+
+    # Returns measured times as dictionary which can be written to JSON
+    def toDict(self):
+        with self._lock:
+            return {"phases": {name: {"seconds": seconds, "calls": calls}
+                               for name, (seconds, calls) in self._totals.items()},
+                    "generations": [dict(generation) for generation in self._generations]}
+
+    # Writes measured times to JSON file
+    def dump(self, fileName):
+        with open(fileName, "w", encoding="utf-8") as f:
+            json.dump(self.toDict(), f, indent="\t")
+
+    # Returns trace which can be loaded in chrome://tracing or Perfetto
+    def toTrace(self):
+        with self._lock:
+            events = list(self._events or [])
+        # name processes, so main process can be told from workers
+        main = os.getpid()
+        for pid in {event["pid"] for event in events}:
+            events.append({"name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+                           "args": {"name": "main" if pid == main else "worker " + str(pid)}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    # Writes trace to JSON file
+    def dumpTrace(self, fileName):
+        with open(fileName, "w", encoding="utf-8") as f:
+            json.dump(self.toTrace(), f)
+
+    # Returns measured times as text table, phases are sorted by time
+    def table(self):
+        numberOfGenerations = max(1, len(self._generations))
+        lines = ["{:<26} {:>10} {:>10} {:>12} {:>14}".format("Phase", "Seconds", "Calls", "Ms/call", "Ms/generation")]
+        for name, (seconds, calls) in sorted(self._totals.items(), key=lambda item: -item[1][0]):
+            lines.append("{:<26} {:>10.3f} {:>10} {:>12.3f} {:>14.3f}".format(
+                name, seconds, calls, 1000 * seconds / calls, 1000 * seconds / numberOfGenerations))
+        return "\n".join(lines)
+
+    def __str__(self):
+        return self.table()
@@ -0,0 +1,50 @@
+from time import perf_counter
+
+
+# Receives progress of algorithm, it is notified once per generation
+# Notifications are passed to update at most once per interval of milliseconds, others are dropped
+# This observer does not show anything, it can be set to algorithm to make it silent
+class ProgressObserver:
+    def __init__(self, interval=0):
+        self._interval = interval / 1000.0
+        self._start = perf_counter()
+        self._last = None
+        # Generation which has been passed to update last time
+        self._generation = None
+
+    # Called by algorithm when it starts running
+    def start(self):
+        self._start = perf_counter()
+        self._last = self._generation = None
+
+    @property
+    # Returns seconds since algorithm has started
+    def elapsed(self):
+        return perf_counter() - self._start
+
+    # Called by algorithm in each generation with its best chromosome and number of evaluated chromosomes
+    def notify(self, generation, best, evaluations):
+        now = perf_counter()
+        if self._last is not None and now - self._last < self._interval:
+            return
+        self._last, self._generation = now, generation
+        self.update(generation, best.fitness, best.objectives, evaluations, now - self._start)
+
+    # Called by algorithm when it stops, last state is passed to update unless it has been passed already
+    def finish(self, generation, best, evaluations):
+        if best is not None and generation != self._generation:
+            self._last, self._generation = perf_counter(), generation
+            self.update(generation, best.fitness, best.objectives, evaluations, self._last - self._start)
+
+    # Override to show or record progress
+    def update(self, generation, fitness, objectives, evaluations, elapsed):
+        pass
+
+
+# Shows fitness of best chromosome and generation in one line of console, used by algorithms by default
+class ConsoleProgress(ProgressObserver):
+    def __init__(self, interval=100):
+        super().__init__(interval)
+
+    def update(self, generation, fitness, objectives, evaluations, elapsed):
+        print("Fitness:", "{:f}\t".format(fitness), "Generation:", generation, end="\r")
@@ -0,0 +1,90 @@
+from model.PopulationEvaluator import PopulationEvaluator
+import numpy as np
+
+
+# Updates chromosomes of whole swarm at once, their evaluation and positions are kept in arrays
+# Positions are decoded and evaluated as a batch, chromosomes are made again only when they have changed
+class Swarm:
+    def __init__(self):
+        self._evaluator = None
+
+
+    # Rows of first objectives which dominate corresponding rows of second objectives
+    @staticmethod
+    def dominates(objectives, others):
+        return np.all(objectives <= others, axis=1) & np.any(objectives < others, axis=1)
+
+
+    # Evaluator of whole population, it is made when it is needed for the first time
+    def getEvaluator(self, chromosome):
+        if self._evaluator is None:
+            self._evaluator = PopulationEvaluator(chromosome.configuration)
+        return self._evaluator
+
+
+    # Returns evaluation of chromosomes as list of arrays of genotypes, criteria, objectives and fitness,
+    # and positions of chromosomes
+    def gather(self, chromosomes):
+        evaluator = self.getEvaluator(chromosomes[0])
+        genotypes = np.array([chromosome.genotype() for chromosome in chromosomes], dtype=np.int32)
+        criteria = np.array([chromosome.criteria for chromosome in chromosomes], dtype=bool)
+        objectives = np.array([chromosome.objectives for chromosome in chromosomes], dtype=float)
+        fitness = np.array([chromosome.fitness for chromosome in chromosomes], dtype=float)
+        return [genotypes, criteria, objectives, fitness], evaluator.encodeGenotypes(genotypes)
+
+
+    # Global best replaces each chromosome which it dominates, otherwise the chromosome becomes global best
+    # The first chromosome becomes global best when there is none, evaluation and positions are changed in place
+    # Returns positions of global best which each chromosome follows, new global best and chromosomes replaced by it
+    def lead(self, evaluation, positions, gBest):
+        size = len(positions)
+        rows, allPositions = [np.copy(values) for values in evaluation], np.copy(positions)
+        leader = 0
+        if gBest is not None:
+            # global best is kept as the last row
+            bestGenotype, bestPosition = self._evaluator.decodePositions(np.reshape(gBest, (1, -1)))
+            best = [bestGenotype, *self._evaluator.evaluateGenotypes(bestGenotype)]
+            rows = [np.concatenate((values, bestValues)) for values, bestValues in zip(rows, best)]
+            allPositions = np.vstack((allPositions, bestPosition))
+            leader = size
+
+        leaders = np.empty(size, dtype=int)
+        changed = np.zeros(size, dtype=bool)
+        objectives = rows[2].tolist()
+        for i in range(size):
+            if i != leader:
+                best, other = objectives[leader], objectives[i]
+                if all(b <= o for b, o in zip(best, other)) and best != other:
+                    for values in rows:
+                        values[i] = values[leader]
+                    allPositions[i], objectives[i], changed[i] = allPositions[leader], best, True
+                else:
+                    leader = i
+            leaders[i] = leader
+
+        for values, newValues in zip(evaluation, rows):
+            values[:] = newValues[: size]
+        positions[:] = allPositions[: size]
+        return allPositions[leaders], allPositions[leader].copy(), changed
+
+
+    # Decodes and evaluates rows of candidate positions at once
+    # Chromosome takes evaluation of its candidate when that one dominates it, evaluation is changed in place
+    # Returns which chromosomes have taken their candidates and positions of chromosomes after that
+    def accept(self, candidates, evaluation, positions):
+        genotypes, placed = self._evaluator.decodePositions(candidates)
+        newEvaluation = [genotypes, *self._evaluator.evaluateGenotypes(genotypes)]
+        better = self.dominates(newEvaluation[2], evaluation[2])
+        for values, newValues in zip(evaluation, newEvaluation):
+            values[better] = newValues[better]
+        return better, np.where(better[:, None], placed, positions)
+
+
+    # Chromosomes at given indices of population, which have changed, are made again from their evaluation
+    @staticmethod
+    def replace(population, indices, evaluation, changed):
+        genotypes, criteria, objectives, fitness = evaluation
+        for j in np.flatnonzero(changed):
+            chromosome = population[indices[j]].makeFromGenotype(genotypes[j])
+            chromosome.setEvaluation(criteria[j], objectives[j], fitness[j])
+            population[indices[j]] = chromosome
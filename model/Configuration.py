@@ -1,10 +1,14 @@
 import json
+import numpy as np
 
 from .Professor import Professor
 from .StudentsGroup import StudentsGroup
 from .Course import Course
 from .Room import Room
 from .CourseClass import CourseClass
+from .Criteria import Criteria
+from .FitnessCache import FitnessCache
+from .PlacementDomain import PlacementDomain
 
 
 # Reads configuration file and stores parsed objects
@@ -24,6 +28,16 @@ class Configuration:
         self._rooms = {}
         # parsed classes
         self._courseClasses = []
+        # flags of classes which have same professor, indexed by IDs of classes
+        self._professorConflicts = np.zeros((0, 0), dtype=bool)
+        # flags of classes which have common student groups, indexed by IDs of classes
+        self._groupConflicts = np.zeros((0, 0), dtype=bool)
+        # flags of rooms which have enough seats and computers for classes, indexed by IDs of classes and rooms
+        self._roomSuitability = np.zeros((0, 0, 2), dtype=bool)
+        # rooms and start times in which classes can be placed
+        self._placementDomain = None
+        # evaluations of recently seen genotypes, None when fitness is always calculated
+        self._fitnessCache = None
 
     # Returns professor with specified ID
     # If there is no professor with such ID method returns NULL
@@ -82,6 +96,37 @@ class Configuration:
     def numberOfCourseClasses(self) -> int:
         return len(self._courseClasses)
 
+    @property
+    # Returns matrix of flags which are set for pairs of classes taught by same professor
+    def professorConflicts(self) -> np.ndarray:
+        return self._professorConflicts
+
+    @property
+    # Returns matrix of flags which are set for pairs of classes attended by same student group
+    def groupConflicts(self) -> np.ndarray:
+        return self._groupConflicts
+
+    @property
+    # Returns array of flags for each class and room, the first flag is set if room has enough seats
+    # and the second one if room has computers when class requires them
+    def roomSuitability(self) -> np.ndarray:
+        return self._roomSuitability
+
+    @property
+    # Returns rooms and start times in which classes can be placed
+    def placementDomain(self) -> PlacementDomain:
+        return self._placementDomain
+
+    @property
+    # Returns cache of evaluations used by chromosomes of this configuration, or None
+    def fitnessCache(self) -> FitnessCache:
+        return self._fitnessCache
+
+    @fitnessCache.setter
+    # Sets FitnessCache, so duplicated chromosomes are not evaluated again, or None to disable caching
+    def fitnessCache(self, fitnessCache):
+        self._fitnessCache = fitnessCache
+
     @property
     # Returns TRUE if configuration is not parsed yet
     def isEmpty(self) -> bool:
@@ -202,6 +247,34 @@ class Configuration:
         # make object and return
         return CourseClass(p, c, lab, dur, group_list)
 
+    # Finds pairs of classes which cannot be held at the same time
+    def __buildConflicts(self):
+        classes = self._courseClasses
+        size = len(classes)
+
+        professors = np.zeros(size, dtype=np.int64)
+        groupIndices = {group: i for i, group in enumerate(self._studentGroups.values())}
+        groups = np.zeros((size, len(groupIndices)), dtype=np.int32)
+        for cc in classes:
+            professors[cc.Id] = cc.Professor.Id
+            for group in cc.Groups:
+                groups[cc.Id, groupIndices[group]] = 1
+
+        self._professorConflicts = professors[:, None] == professors[None, :]
+        self._groupConflicts = (groups @ groups.T) > 0
+
+        # class does not conflict with itself
+        np.fill_diagonal(self._professorConflicts, False)
+        np.fill_diagonal(self._groupConflicts, False)
+
+    # Checks seats and computers of each room for each class
+    def __buildRoomSuitability(self):
+        classes, rooms = self._courseClasses, self._rooms
+        self._roomSuitability = np.zeros((len(classes), len(rooms), 2), dtype=bool)
+        for cc in classes:
+            for r in rooms.values():
+                self._roomSuitability[cc.Id, r.Id] = Criteria.isSeatEnough(r, cc), Criteria.isComputerEnough(r, cc)
+
     # parse file and store parsed object
     def parseFile(self, fileName):
         # clear previously parsed objects
@@ -236,4 +309,7 @@ class Configuration:
                     courseClass = self.__parseCourseClass(dictConfig[key])
                     self._courseClasses.append(courseClass)
 
+        self.__buildConflicts()
+        self.__buildRoomSuitability()
+        self._placementDomain = PlacementDomain(self)
         self._isEmpty = False
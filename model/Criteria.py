@@ -9,8 +9,7 @@ class Criteria:
     @staticmethod
     def isRoomOverlapped(slots, reservation, dur):
         reservation_index = hash(reservation)
-        cls = slots[reservation_index: reservation_index + dur]
-        return any(True for slot in cls if len(slot) > 1)
+        return bool((slots[reservation_index: reservation_index + dur] > 1).any())
 
     # does current room have enough seats
     @staticmethod
@@ -23,26 +22,27 @@ class Criteria:
         return (not cc.LabRequired) or (cc.LabRequired and r.Lab)
 
     # check overlapping of classes for professors and student groups
+    # professorConflicts and groupConflicts are rows of conflict matrices for class cc, indexed by IDs of classes
     @staticmethod
-    def isOverlappedProfStudentGrp(slots, cc, numberOfRooms, timeId):
+    def isOverlappedProfStudentGrp(slotClasses, cc, numberOfRooms, timeId, professorConflicts, groupConflicts):
         po = go = False
 
         dur = cc.Duration
         for i in range(numberOfRooms, 0, -1):
             # for each hour of class
             for j in range(timeId, timeId + dur):
-                cl = slots[j]
+                cl = slotClasses.get(j, ())
                 for cc1 in cl:
-                    if cc != cc1:
-                        # professor overlaps?
-                        if not po and cc.professorOverlaps(cc1):
-                            po = True
-                        # student group overlaps?
-                        if not go and cc.groupsOverlap(cc1):
-                            go = True
-                        # both type of overlapping? no need to check more
-                        if po and go:
-                            return po, go
+                    id1 = cc1.Id
+                    # professor overlaps?
+                    if not po and professorConflicts[id1]:
+                        po = True
+                    # student group overlaps?
+                    if not go and groupConflicts[id1]:
+                        go = True
+                    # both type of overlapping? no need to check more
+                    if po and go:
+                        return po, go
 
             timeId += Constant.DAY_HOURS
         return po, go
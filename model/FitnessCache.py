@@ -0,0 +1,84 @@
+from collections import OrderedDict
+import hashlib
+import threading
+import numpy as np
+
+
+# Remembers evaluation of recently seen genotypes, so fitness of duplicated chromosomes is not calculated again
+# Least recently used entries are dropped when number of entries exceeds capacity
+class FitnessCache:
+    def __init__(self, capacity=10000):
+        self._capacity = capacity
+        # evaluation (criteria, objectives, fitness) for each hash of genotype
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = self._misses = 0
+
+    # Returns hash of reservation indices, which is the same in all processes and executions
+    @staticmethod
+    def key(genotype):
+        return hashlib.blake2b(np.ascontiguousarray(genotype, dtype=np.int32).tobytes(), digest_size=16).digest()
+
+    # Returns evaluation of genotype, or None when it is not in cache
+    def get(self, genotype):
+        key = self.key(genotype)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            self._hits += 1
+            self._entries.move_to_end(key)
+            return entry
+
+    # Stores evaluation of genotype, arrays are copied
+    def put(self, genotype, criteria, objectives, fitness):
+        key = self.key(genotype)
+        entry = (np.array(criteria, dtype=bool), np.array(objectives, dtype=float), float(fitness))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._capacity:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = 0
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    # Returns number of evaluations found in cache
+    def hits(self):
+        return self._hits
+
+    @property
+    # Returns number of evaluations not found in cache
+    def misses(self):
+        return self._misses
+
+    @property
+    def hitRate(self):
+        total = self._hits + self._misses
+        return self._hits / total if total else 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+    # Lock cannot be pickled, cache is copied to other processes without it
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __str__(self):
+        return "{} entries, {} hits, {} misses ({:.1%} hit rate)".format(len(self), self._hits, self._misses,
+                                                                       self.hitRate)
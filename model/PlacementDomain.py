@@ -0,0 +1,62 @@
+from .Constant import Constant
+from numpy.random import randint as randrange
+
+import numpy as np
+
+
+# Stores rooms and start times in which each class can be placed
+class PlacementDomain:
+    # Initializes domains of classes from parsed configuration
+    def __init__(self, configuration):
+        classes = configuration.courseClasses
+        nr = configuration.numberOfRooms
+
+        # rooms with enough seats and computers, if they are required
+        suitable = configuration.roomSuitability.all(axis=2)
+
+        # allowed rooms of each class, indexed by ID of class
+        self._rooms = len(classes) * [None]
+        # valid start times of each class, indexed by ID of class
+        self._times = len(classes) * [None]
+        # allowed room which is used instead of each room, one row per class and one column per room
+        self._roomMap = np.zeros((len(classes), nr), dtype=np.int32)
+
+        for cc in classes:
+            rooms = np.flatnonzero(suitable[cc.Id])
+            # no room is good enough, so class can be placed in any room
+            if len(rooms) == 0:
+                rooms = np.arange(nr)
+
+            roomMap = rooms[np.arange(nr) % len(rooms)]
+            roomMap[rooms] = rooms
+
+            self._rooms[cc.Id] = rooms
+            self._times[cc.Id] = np.arange(Constant.DAY_HOURS - cc.Duration)
+            self._roomMap[cc.Id] = roomMap
+
+    # Returns rooms in which class can be placed
+    def getRooms(self, cc):
+        return self._rooms[cc.Id]
+
+    # Returns hours at which class can start
+    def getStartTimes(self, cc):
+        return self._times[cc.Id]
+
+    @property
+    # Returns table of allowed rooms used instead of each room, one row per class and one column per room
+    def roomMap(self):
+        return self._roomMap
+
+    # Returns randomly chosen room in which class can be placed
+    def randomRoom(self, cc):
+        rooms = self._rooms[cc.Id]
+        return int(rooms[randrange(len(rooms))])
+
+    # Returns randomly chosen hour at which class can start
+    def randomTime(self, cc):
+        times = self._times[cc.Id]
+        return int(times[randrange(len(times))])
+
+    # Returns room itself if class can be placed in it, otherwise allowed room used instead
+    def fitRoom(self, cc, room):
+        return int(self._roomMap[cc.Id, room])
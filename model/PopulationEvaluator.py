@@ -0,0 +1,152 @@
+from .Constant import Constant
+from .Criteria import Criteria
+import numpy as np
+
+
+# Calculates fitness of all chromosomes in population at once
+# Population is represented by matrix of reservation indices, one row per chromosome and one column per class
+class PopulationEvaluator:
+    # Initializes evaluator with configuration block, data which does not depend on chromosomes is prepared here
+    def __init__(self, configuration):
+        self._configuration = configuration
+        classes = configuration.courseClasses
+        nr = configuration.numberOfRooms
+        self._numberOfClasses = len(classes)
+        self._slotsLength = Constant.DAYS_NUM * Constant.DAY_HOURS * nr
+
+        # duration of each class and which hours of which class are stored in a row of hours
+        self._duration = np.array([cc.Duration for cc in classes], dtype=np.int32)
+        self._hourClass = np.repeat(np.arange(len(classes)), self._duration)
+        self._hourOffset = np.concatenate([np.arange(dur, dtype=np.int32) for dur in self._duration])
+        self._hourStart = np.concatenate(([0], np.cumsum(self._duration)[:-1]))
+
+        # pairs of classes which cannot be held at the same time
+        self._professorPairs = np.array(np.nonzero(np.triu(configuration.professorConflicts)), dtype=np.int32)
+        self._groupPairs = np.array(np.nonzero(np.triu(configuration.groupConflicts)), dtype=np.int32)
+
+        weights = np.array(Criteria.weights, dtype=float)
+        self._weights = weights
+        # value added to objectives when criteria violation occurs
+        self._penalties = np.where(weights > 0, 1, 2)
+
+    # Marks classes of each chromosome which are held at the same time as another class of given pairs
+    def __overlapped(self, pairs, day, time):
+        N = day.shape[0]
+        overlapped = np.zeros((N, self._numberOfClasses), dtype=bool)
+        if pairs.shape[1] == 0:
+            return overlapped
+
+        a, b = pairs
+        duration = self._duration
+        clash = (day[:, a] == day[:, b]) & (time[:, a] < time[:, b] + duration[b]) & (time[:, b] < time[:, a] + duration[a])
+        rows, cols = np.nonzero(clash)
+        overlapped[rows, a[cols]] = True
+        overlapped[rows, b[cols]] = True
+        return overlapped
+
+    # Calculates criteria flags, objectives and fitness values of population
+    # Returns arrays of shape (N, classes * criteria), (N, criteria) and (N,)
+    def evaluate(self, genotypes):
+        genotypes = np.asarray(genotypes, dtype=np.int32)
+        N, M = genotypes.shape
+        DAY_HOURS = Constant.DAY_HOURS
+        daySize = DAY_HOURS * self._configuration.numberOfRooms
+        slotsLength = self._slotsLength
+
+        # coordinate of time-space slot
+        day = genotypes // daySize
+        room = (genotypes % daySize) // DAY_HOURS
+        time = genotypes % DAY_HOURS
+
+        # count classes in each time-space slot of each chromosome
+        hours = genotypes[:, self._hourClass] + self._hourOffset
+        hours += (np.arange(N, dtype=np.int32) * slotsLength)[:, None]
+        slots = np.bincount(hours.ravel(), minlength=N * slotsLength)
+        roomOverlapped = np.logical_or.reduceat(slots[hours] > 1, self._hourStart, axis=1)
+
+        criteria = np.empty((N, M, len(Criteria.weights)), dtype=bool)
+        classIds = np.arange(M)[None, :]
+
+        # on room overlapping
+        criteria[:, :, 0] = ~roomOverlapped
+
+        # does current room have enough seats and computers if they are required
+        criteria[:, :, 1: 3] = self._configuration.roomSuitability[classIds, room]
+
+        # professors have no overlapping classes?
+        criteria[:, :, 3] = ~self.__overlapped(self._professorPairs, day, time)
+
+        # student groups has no overlapping classes?
+        criteria[:, :, 4] = ~self.__overlapped(self._groupPairs, day, time)
+
+        satisfied = criteria.sum(axis=1)
+        objectives = (M - satisfied) * self._penalties
+        score = satisfied.sum(axis=1) + (M - satisfied) @ self._weights
+        fitness = score / (M * len(Criteria.weights))
+
+        return criteria.reshape(N, -1), objectives.astype(float), fitness
+
+    # Calculates criteria flags, objectives and fitness values like evaluate,
+    # but genotypes which are found in fitness cache of configuration are not evaluated again
+    def evaluateGenotypes(self, genotypes):
+        genotypes = np.asarray(genotypes, dtype=np.int32)
+        cache = self._configuration.fitnessCache
+        if cache is None:
+            return self.evaluate(genotypes)
+
+        entries = [cache.get(genotype) for genotype in genotypes]
+        missing = [i for i, entry in enumerate(entries) if entry is None]
+        if missing:
+            criteria, objectives, fitness = self.evaluate(genotypes[missing])
+            for j, i in enumerate(missing):
+                entries[i] = criteria[j], objectives[j], fitness[j]
+                cache.put(genotypes[i], *entries[i])
+
+        criteria, objectives, fitness = zip(*entries)
+        return np.array(criteria, dtype=bool), np.array(objectives, dtype=float), np.array(fitness, dtype=float)
+
+    # Calculates fitness of chromosomes in population and stores results in them
+    # Only genotypes which are not found in fitness cache of configuration are evaluated
+    def evaluatePopulation(self, population):
+        if not population:
+            return
+
+        genotypes = np.array([chromosome.genotype() for chromosome in population], dtype=np.int32)
+        criteria, objectives, fitness = self.evaluateGenotypes(genotypes)
+        for i, chromosome in enumerate(population):
+            chromosome.setEvaluation(criteria[i], objectives[i], fitness[i])
+
+    # Converts rows of positions (day, room, time of each class) to genotypes in the same way as
+    # Schedule.updatePositions, returns genotypes and positions of classes where they are actually placed
+    def decodePositions(self, positions):
+        positions = np.asarray(positions, dtype=float)
+        DAY_HOURS = Constant.DAY_HOURS
+        nr = self._configuration.numberOfRooms
+        classIds = np.arange(self._numberOfClasses)
+
+        day = self.__wrap(positions[:, 0::3], Constant.DAYS_NUM)
+        room = self._configuration.placementDomain.roomMap[classIds, self.__wrap(positions[:, 1::3], nr)]
+        time = self.__wrap(positions[:, 2::3], DAY_HOURS - self._duration)
+
+        placed = np.empty(positions.shape, dtype=float)
+        placed[:, 0::3], placed[:, 1::3], placed[:, 2::3] = day, room, time
+        return (day * nr + room) * DAY_HOURS + time, placed
+
+    # Returns rows of positions (day, room, time of each class) of genotypes, like Schedule.extractPositions
+    def encodeGenotypes(self, genotypes):
+        genotypes = np.asarray(genotypes, dtype=np.int32)
+        DAY_HOURS = Constant.DAY_HOURS
+        daySize = DAY_HOURS * self._configuration.numberOfRooms
+
+        positions = np.empty((genotypes.shape[0], 3 * genotypes.shape[1]), dtype=float)
+        positions[:, 0::3] = genotypes // daySize
+        positions[:, 1::3] = (genotypes % daySize) // DAY_HOURS
+        positions[:, 2::3] = genotypes % DAY_HOURS
+        return positions
+
+    # Truncates values to integers and returns their non-negative remainders, like abs(int(value) % modulus)
+    # Values which are not finite are mapped to zero
+    @staticmethod
+    def __wrap(values, modulus):
+        remainders = np.nan_to_num(np.fmod(np.trunc(values), modulus))
+        return np.where(remainders < 0, remainders + modulus, remainders).astype(np.int32)
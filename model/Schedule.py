@@ -14,10 +14,15 @@ class Schedule:
         self._configuration = configuration
         # Fitness value of chromosome
         self._fitness = 0
+        # Score of chromosome, sum of scores of all classes
+        self._score = 0
 
-        # Time-space slots, one entry represent one hour in one classroom
+        # Time-space slots, one entry represent number of classes in one hour in one classroom
         slots_length = Constant.DAYS_NUM * Constant.DAY_HOURS * self._configuration.numberOfRooms
-        self._slots = [[] for _ in range(slots_length)]
+        self._slots = np.zeros(slots_length, dtype=np.int16)
+
+        # Classes in time-space slots, only occupied slots have an entry
+        self._slotClasses = {}
 
         # Class table for chromosome
         # Used to determine first time-space slot used by class
@@ -32,42 +37,48 @@ class Schedule:
         self._convertedObjectives = []
         self._objectives = []
 
+        # Profiler which measures fitness calculation, it is passed to chromosomes made from this one
+        self._profiler = None
+
     def copy(self, c, setup_only):
         if not setup_only:
             self._configuration = c.configuration
             # copy code
-            self._slots, self._classes = [row[:] for row in c.slots], {key: value for key, value in c.classes.items()}
+            self._slots, self._classes = c.slots.copy(), {key: value for key, value in c.classes.items()}
+            # entries are tuples, so they can be shared between chromosomes
+            self._slotClasses = dict(c.slotClasses)
 
             # copy flags of class requirements
-            self._criteria = c.criteria[:]
-            self._objectives = c.objectives[:]
+            self._criteria = np.copy(c.criteria)
+            self._objectives = np.copy(c.objectives)
 
             # copy fitness
-            self._fitness = c.fitness
+            self._fitness, self._score = c.fitness, c._score
 
             if c.convertedObjectives is not None:
                 self._convertedObjectives = c.convertedObjectives[:]
             return self
 
-        return Schedule(c.configuration)
+        chromosome = Schedule(c.configuration)
+        chromosome._profiler = c.profiler
+        return chromosome
 
     # Makes new chromosome with same setup but with randomly chosen code
-    def makeNewFromPrototype(self, positions = None):
+    def makeNewFromPrototype(self, positions = None, evaluate = True):
         # make new chromosome, copy chromosome setup
         new_chromosome = self.copy(self, True)
-        new_chromosome_slots, new_chromosome_classes = new_chromosome._slots, new_chromosome._classes
+        new_chromosome_classes = new_chromosome._classes
 
         # place classes at random position
         classes = self._configuration.courseClasses
         nr = self._configuration.numberOfRooms
-        DAYS_NUM, DAY_HOURS = Constant.DAYS_NUM, Constant.DAY_HOURS
+        domain = self._configuration.placementDomain
+        DAYS_NUM = Constant.DAYS_NUM
         for c in classes:
             # determine random position of class
-            dur = c.Duration
-
             day = randrange(DAYS_NUM)
-            room = randrange(nr)
-            time = randrange(DAY_HOURS - dur)
+            room = domain.randomRoom(c)
+            time = domain.randomTime(c)
             reservation = Reservation.getReservation(nr, day, time, room)
 
             if positions is not None:
@@ -77,19 +88,19 @@ class Schedule:
             reservation_index = hash(reservation)
 
             # fill time-space slots, for each hour of class
-            for i in range(dur - 1, -1, -1):
-                new_chromosome_slots[reservation_index + i].append(c)
+            new_chromosome.__placeClass(c, reservation_index)
 
             # insert in class table of chromosome
             new_chromosome_classes[c] = reservation_index
 
-        new_chromosome.calculateFitness()
+        if evaluate:
+            new_chromosome.calculateFitness()
         return new_chromosome
         
     def makeEmptyFromPrototype(self, bounds = None):
         # make new chromosome, copy chromosome setup
         new_chromosome = self.copy(self, True)
-        new_chromosome_slots, new_chromosome_classes = new_chromosome._slots, new_chromosome._classes
+        new_chromosome_classes = new_chromosome._classes
 
         # place classes at random position
         classes = self._configuration.courseClasses
@@ -108,21 +119,47 @@ class Schedule:
 
         return new_chromosome
 
+    # Makes new chromosome with same setup and classes placed at reservation indices from genotype
+    # Fitness is not calculated, it can be set by setEvaluation
+    def makeFromGenotype(self, genotype):
+        # make new chromosome, copy chromosome setup
+        new_chromosome = self.copy(self, True)
+        new_chromosome_classes = new_chromosome._classes
+
+        # reservation indices are parsed using number of rooms, which may not be set in this process yet
+        Reservation.getReservation(self._configuration.numberOfRooms, 0, 0, 0)
+
+        for c, reservation_index in zip(self._configuration.courseClasses, genotype):
+            reservation_index = int(reservation_index)
+            if reservation_index > -1:
+                # fill time-space slots, for each hour of class
+                new_chromosome.__placeClass(c, reservation_index)
+
+            # insert in class table of chromosome
+            new_chromosome_classes[c] = reservation_index
+
+        return new_chromosome
+
     # Performs crossover operation using to chromosomes and returns pointer to offspring
-    def crossover(self, parent, numberOfCrossoverPoints, crossoverProbability):
+    def crossover(self, parent, numberOfCrossoverPoints, crossoverProbability, evaluate = True):
         # check probability of crossover operation
         if randrange(100) > crossoverProbability:
             # no crossover, just copy first parent
             return self.copy(self, False)
 
+        return self.makeFromParents(self, parent, numberOfCrossoverPoints, evaluate)
+
+    # Makes new chromosome with same setup by combining classes of two parents, they are switched at crossover points
+    # Only tables of classes of parents are read, so they can be views of shared population, e.g. ScheduleView
+    def makeFromParents(self, father, mother, numberOfCrossoverPoints, evaluate = True):
         # new chromosome object, copy chromosome setup
         n = self.copy(self, True)
-        n_classes, n_slots = n._classes, n._slots
+        n_classes = n._classes
 
-        classes = self._classes
+        classes = father.classes
         course_classes = tuple(classes.keys())
-        parent_classes = parent.classes
-        parent_course_classes = tuple(parent.classes.keys())
+        parent_classes = mother.classes
+        parent_course_classes = tuple(parent_classes.keys())
 
         # number of classes
         size = len(classes)
@@ -143,45 +180,43 @@ class Schedule:
         for i in range(size):
             if first:
                 course_class = course_classes[i]
-                dur = course_class.Duration
                 reservation_index = classes[course_class]
                 # insert class from first parent into new chromosome's class table
                 n_classes[course_class] = reservation_index
                 # all time-space slots of class are copied
-                for j in range(dur - 1, -1, -1):
-                    n_slots[reservation_index + j].append(course_class)
+                n.__placeClass(course_class, reservation_index)
             else:
                 course_class = parent_course_classes[i]
-                dur = course_class.Duration
                 reservation_index = parent_classes[course_class]
                 # insert class from second parent into new chromosome's class table
                 n_classes[course_class] = reservation_index
                 # all time-space slots of class are copied
-                for j in range(dur - 1, -1, -1):
-                    n_slots[reservation_index + j].append(course_class)
+                n.__placeClass(course_class, reservation_index)
 
             # crossover point
             if cp[i]:
                 # change source chromosome
                 first = not first
 
-        n.calculateFitness()
+        if evaluate:
+            n.calculateFitness()
 
         # return smart pointer to offspring
         return n
         
     # Performs crossover operation using to chromosomes and returns pointer to offspring
-    def crossovers(self, parent, r1, r2, r3, etaCross, crossoverProbability):
+    def crossovers(self, parent, r1, r2, r3, etaCross, crossoverProbability, evaluate = True):
         # number of classes
         size = len(self._classes)
         jrand = randrange(size)
         
         nr = self._configuration.numberOfRooms
+        domain = self._configuration.placementDomain
         DAY_HOURS, DAYS_NUM = Constant.DAY_HOURS, Constant.DAYS_NUM
 
         # make new chromosome, copy chromosome setup
         new_chromosome = self.copy(self, True)
-        new_chromosome_slots, new_chromosome_classes = new_chromosome._slots, new_chromosome._classes
+        new_chromosome_classes = new_chromosome._classes
         classes = self._classes
         course_classes = tuple(classes.keys())
         parent_classes = parent.classes
@@ -204,6 +239,7 @@ class Schedule:
                     room = 0
                 elif room >= nr:
                     room = nr - 1
+                room = domain.fitRoom(course_class, room)
 
                 time = int(reservation3.Time + etaCross * (reservation1.Time - reservation2.Time))
                 if time < 0:
@@ -215,59 +251,76 @@ class Schedule:
                 reservation_index = hash(reservation)
 
                 # fill time-space slots, for each hour of class
-                for j in range(dur - 1, -1, -1):
-                    new_chromosome_slots[reservation_index + j].append(course_class)
+                new_chromosome.__placeClass(course_class, reservation_index)
 
                 # insert in class table of chromosome
                 new_chromosome_classes[course_class] = reservation_index
             else:
                 course_class = parent_course_classes[i]
-                dur = course_class.Duration
                 reservation = parent_classes[course_class]
                 reservation_index = hash(reservation)
                 
                 # all time-space slots of class are copied
-                for j in range(dur - 1, -1, -1):
-                    new_chromosome_slots[reservation_index + j].append(course_class)
+                new_chromosome.__placeClass(course_class, reservation_index)
                 
                 # insert class from second parent into new chromosome's class table
                 new_chromosome_classes[course_class] = reservation_index
 
-        new_chromosome.calculateFitness()
+        if evaluate:
+            new_chromosome.calculateFitness()
 
         # return smart pointer to offspring
         return new_chromosome
 
+    # Puts class in all time-space slots beginning at reservation_index
+    def __placeClass(self, cc, reservation_index):
+        slotClasses = self._slotClasses
+        dur = cc.Duration
+
+        self._slots[reservation_index: reservation_index + dur] += 1
+        for j in range(reservation_index, reservation_index + dur):
+            slotClasses[j] = slotClasses.get(j, ()) + (cc,)
+
+    # Removes class from all time-space slots beginning at reservation_index
+    def __removeClass(self, cc, reservation_index):
+        slots, slotClasses = self._slots, self._slotClasses
+
+        for j in range(reservation_index, reservation_index + cc.Duration):
+            cl = slotClasses.get(j)
+            if cl is None or cc not in cl:
+                continue
+
+            rest = tuple(cc1 for cc1 in cl if cc1 != cc)
+            slots[j] -= len(cl) - len(rest)
+            if rest:
+                slotClasses[j] = rest
+            else:
+                del slotClasses[j]
+
     def repair(self, cc1: CourseClass, reservation1_index: int, reservation2: Reservation):
         nr = self._configuration.numberOfRooms
-        DAY_HOURS, DAYS_NUM = Constant.DAY_HOURS, Constant.DAYS_NUM
-        slots = self._slots
-        dur = cc1.Duration
+        domain = self._configuration.placementDomain
 
         if reservation1_index > -1:
-            for j in range(dur):
-                # remove class hour from current time-space slot
-                cl = slots[reservation1_index + j]
-                while cc1 in cl:
-                    cl.remove(cc1)
+            # remove class hours from current time-space slots
+            self.__removeClass(cc1, reservation1_index)
 
         # determine position of class randomly
         if reservation2 is None:
-            day = randrange(DAYS_NUM)
-            room = randrange(nr)
-            time = randrange(DAY_HOURS - dur)
+            day = randrange(Constant.DAYS_NUM)
+            room = domain.randomRoom(cc1)
+            time = domain.randomTime(cc1)
             reservation2 = Reservation.getReservation(nr, day, time, room)
 
         reservation2_index = hash(reservation2)
-        for j in range(dur):
-            # move class hour to new time-space slot
-            slots[reservation2_index + j].append(cc1)
+        # move class hours to new time-space slots
+        self.__placeClass(cc1, reservation2_index)
 
         # change entry of class table to point to new time-space slots
         self._classes[cc1] = reservation2_index
 
     # Performs mutation on chromosome
-    def mutation(self, mutationSize, mutationProbability):
+    def mutation(self, mutationSize, mutationProbability, evaluate = True):
         # check probability of mutation operation
         if randrange(100) > mutationProbability:
             return
@@ -279,6 +332,9 @@ class Schedule:
         configuration = self._configuration
         nr = configuration.numberOfRooms
 
+        # classes which are moved and time-space slots they have occupied
+        moved = []
+
         # move selected number of classes at random position
         for i in range(mutationSize, 0, -1):
             # select ranom chromosome for movement
@@ -289,68 +345,148 @@ class Schedule:
             reservation1_index = classes[cc1]
 
             self.repair(cc1, reservation1_index, None)
+            moved.append((cc1, reservation1_index))
+            moved.append((cc1, classes[cc1]))
 
-        self.calculateFitness()
-
-    # Calculates fitness value of chromosome
-    def calculateFitness(self):
-        # increment value when criteria violation occurs
-        self._objectives = np.zeros(len(Criteria.weights))
-
-        # chromosome's score
-        score = 0
+        if evaluate:
+            self.updateFitness(moved)
 
+    # Checks criteria of class placed at reservation_index and stores flags beginning at ci
+    def __checkClass(self, cc, reservation_index, ci):
         criteria, configuration = self._criteria, self._configuration
-        items, slots = self._classes.items(), self._slots
         numberOfRooms = configuration.numberOfRooms
-        DAY_HOURS, DAYS_NUM = Constant.DAY_HOURS, Constant.DAYS_NUM
-        daySize = DAY_HOURS * numberOfRooms
+        daySize = Constant.DAY_HOURS * numberOfRooms
 
-        ci = 0
-        getRoomById = configuration.getRoomById
+        reservation = Reservation.parse(reservation_index)
 
-        # check criteria and calculate scores for each class in schedule
-        for cc, reservation_index in items:
-            reservation = Reservation.parse(reservation_index)
+        # coordinate of time-space slot
+        day, time, room = reservation.Day, reservation.Time, reservation.Room
 
-            # coordinate of time-space slot
-            day, time, room = reservation.Day, reservation.Time, reservation.Room
+        dur = cc.Duration
 
-            dur = cc.Duration
+        ro = Criteria.isRoomOverlapped(self._slots, reservation, dur)
+
+        # on room overlapping
+        criteria[ci + 0] = not ro
+
+        # does current room have enough seats and computers if they are required
+        criteria[ci + 1: ci + 3] = configuration.roomSuitability[cc.Id, room]
+
+        # check overlapping of classes for professors and student groups
+        timeId = day * daySize + time
+        po, go = Criteria.isOverlappedProfStudentGrp(self._slotClasses, cc, numberOfRooms, timeId,
+                                                     configuration.professorConflicts[cc.Id],
+                                                     configuration.groupConflicts[cc.Id])
+
+        # professors have no overlapping classes?
+        criteria[ci + 3] = not po
+
+        # student groups has no overlapping classes?
+        criteria[ci + 4] = not go
+
+    # Adds (sign = 1) or removes (sign = -1) score and objectives of class with criteria beginning at ci
+    def __scoreClass(self, ci, sign):
+        criteria, objectives = self._criteria, self._objectives
+        weights = Criteria.weights
 
-            ro = Criteria.isRoomOverlapped(slots, reservation, dur)
+        score = 0
+        for i in range(len(weights)):
+            if criteria[ci + i]:
+                score += 1
+            else:
+                score += weights[i]
+                objectives[i] += sign * (1 if weights[i] > 0 else 2)
 
-            # on room overlapping
-            criteria[ci + 0] = not ro
+        self._score += sign * score
 
-            r = getRoomById(room)
-            # does current room have enough seats
-            criteria[ci + 1] = Criteria.isSeatEnough(r, cc)
+    # Calculates fitness value of chromosome
+    # Evaluation of genotype which has been seen recently is taken from fitness cache of configuration
+    # Calculation is measured by profiler of chromosome, when it is set
+    def calculateFitness(self):
+        if self._profiler is None:
+            return self.__calculateFitness()
+        with self._profiler.phase("calculateFitness"):
+            return self.__calculateFitness()
+
+    def __calculateFitness(self):
+        cache = self._configuration.fitnessCache
+        if cache is not None:
+            genotype = self.genotype()
+            entry = cache.get(genotype)
+            if entry is not None:
+                self.setEvaluation(*entry)
+                return
 
-            # does current room have computers if they are required
-            criteria[ci + 2] = Criteria.isComputerEnough(r, cc)
+        # increment value when criteria violation occurs
+        self._objectives = np.zeros(len(Criteria.weights))
 
-            # check overlapping of classes for professors and student groups
-            timeId = day * daySize + time
-            po, go = Criteria.isOverlappedProfStudentGrp(slots, cc, numberOfRooms, timeId)
+        # chromosome's score
+        self._score = 0
 
-            # professors have no overlapping classes?
-            criteria[ci + 3] = not po
+        numberOfCriteria = len(Criteria.weights)
+        ci = 0
 
-            # student groups has no overlapping classes?
-            criteria[ci + 4] = not go
+        # check criteria and calculate scores for each class in schedule
+        for cc, reservation_index in self._classes.items():
+            self.__checkClass(cc, reservation_index, ci)
+            self.__scoreClass(ci, 1)
+            ci += numberOfCriteria
 
-            for i in range(len(self._objectives)):
-                if criteria[ci + i]:
-                    score += 1
-                else:
-                    score += Criteria.weights[i]
-                    self._objectives[i] += 1 if Criteria.weights[i] > 0 else 2
+        # calculate fitness value based on score
+        self._fitness = self._score / len(self._criteria)
+
+        if cache is not None:
+            cache.put(genotype, self._criteria, self._objectives, self._fitness)
+
+    # Updates fitness value of chromosome after some classes are moved
+    # Only moved classes and classes which share time slots with their old and new positions are checked again
+    # Calculation is measured by profiler of chromosome, when it is set
+    def updateFitness(self, moved):
+        if self._profiler is None:
+            return self.__updateFitness(moved)
+        with self._profiler.phase("updateFitness"):
+            return self.__updateFitness(moved)
+
+    def __updateFitness(self, moved):
+        classes, slotClasses = self._classes, self._slotClasses
+        DAY_HOURS = Constant.DAY_HOURS
+        numberOfRooms = self._configuration.numberOfRooms
+        daySize = DAY_HOURS * numberOfRooms
 
-            ci += len(Criteria.weights)
+        # classes moved and classes found in any room at the hours of old or new positions
+        affected = set()
+        for cc, reservation_index in moved:
+            affected.add(cc)
+            if reservation_index < 0:
+                continue
+
+            day = reservation_index // daySize
+            timeId = day * daySize + reservation_index % DAY_HOURS
+            for i in range(numberOfRooms, 0, -1):
+                for j in range(timeId, timeId + cc.Duration):
+                    affected.update(slotClasses.get(j, ()))
+                timeId += DAY_HOURS
+
+        numberOfCriteria = len(Criteria.weights)
+        for cc in affected:
+            ci = cc.Id * numberOfCriteria
+            self.__scoreClass(ci, -1)
+            self.__checkClass(cc, classes[cc], ci)
+            self.__scoreClass(ci, 1)
 
         # calculate fitness value based on score
-        self._fitness = score / len(criteria)
+        self._fitness = self._score / len(self._criteria)
+
+    # Sets fitness value of chromosome calculated outside, e.g. by PopulationEvaluator
+    def setEvaluation(self, criteria, objectives, fitness):
+        self._criteria = np.array(criteria, dtype=bool)
+        self._objectives = np.array(objectives, dtype=float)
+        self._fitness = float(fitness)
+        self._score = self._fitness * len(self._criteria)
+
+    # Returns reservation indices of classes in order of configuration
+    def genotype(self):
+        return np.fromiter(self._classes.values(), dtype=np.int32, count=len(self._classes))
 
     def getDifference(self, other):
         return (self._criteria ^ other.criteria).sum()
@@ -373,12 +509,13 @@ class Schedule:
     def updatePositions(self, positions):
         DAYS_NUM, DAY_HOURS = Constant.DAYS_NUM, Constant.DAY_HOURS
         nr = self._configuration.numberOfRooms
+        domain = self._configuration.placementDomain
         i = 0
         items = self._classes.items()
         for cc, reservation1_index in items:
             dur = cc.Duration
             day = abs(int(positions[i]) % DAYS_NUM)
-            room = abs(int(positions[i + 1]) % nr)
+            room = domain.fitRoom(cc, abs(int(positions[i + 1]) % nr))
             time = abs(int(positions[i + 2]) % (DAY_HOURS - dur))
 
             reservation2 = Reservation.getReservation(nr, day, time, room)
@@ -403,6 +540,15 @@ class Schedule:
     def configuration(self):
         return self._configuration
 
+    @property
+    # Returns profiler which measures fitness calculation, None when it is not measured
+    def profiler(self):
+        return self._profiler
+
+    @profiler.setter
+    def profiler(self, profiler):
+        self._profiler = profiler
+
     @property
     # Returns reference to table of classes
     def classes(self):
@@ -418,6 +564,11 @@ class Schedule:
     def slots(self):
         return self._slots
 
+    @property
+    # Return reference to classes in occupied time-space slots
+    def slotClasses(self):
+        return self._slotClasses
+
     @property
     def diversity(self):
         return self._diversity
@@ -0,0 +1,38 @@
+# Chromosome stored in one row of shared population, it can only be read
+# Table of classes is made from reservation indices without placing classes, so view is cheap to make
+# and it can be used as parent by Schedule.makeFromParents
+class ScheduleView:
+    def __init__(self, population, index):
+        self._population = population
+        self._index = index
+
+    @property
+    def index(self):
+        return self._index
+
+    @property
+    def configuration(self):
+        return self._population.configuration
+
+    # Returns reservation indices of classes in order of configuration
+    def genotype(self):
+        return self._population.genotypes[self._index]
+
+    @property
+    # Returns table of classes, it is made from reservation indices each time
+    def classes(self):
+        return dict(zip(self._population.configuration.courseClasses, self.genotype().tolist()))
+
+    @property
+    # Returns array of flags of class requirements satisfaction
+    def criteria(self):
+        return self._population.criteria[self._index]
+
+    @property
+    def objectives(self):
+        return self._population.objectives[self._index]
+
+    @property
+    # Returns fitness value of chromosome
+    def fitness(self):
+        return float(self._population.fitness[self._index])
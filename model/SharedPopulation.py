@@ -0,0 +1,109 @@
+from .Criteria import Criteria
+from .ScheduleView import ScheduleView
+from multiprocessing import shared_memory
+import numpy as np
+
+
+# Population stored in shared memory, so it can be read and written in place by other processes
+# Each row holds reservation indices, flags of class requirements, objectives and fitness of one chromosome,
+# and whether the chromosome has been evaluated at all
+class SharedPopulation:
+    # Creates new block of shared memory for given number of chromosomes,
+    # or attaches to existing block when its name is given
+    def __init__(self, configuration, capacity, name=None):
+        self._configuration = configuration
+        self._capacity = capacity
+        numberOfClasses = configuration.numberOfCourseClasses
+        numberOfCriteria = len(Criteria.weights)
+
+        # arrays stored in block, each of them starts at offset aligned to 8 bytes
+        layout = ((np.int32, (capacity, numberOfClasses)), (bool, (capacity, numberOfClasses * numberOfCriteria)),
+                  (np.float64, (capacity, numberOfCriteria)), (np.float64, (capacity,)), (bool, (capacity,)))
+        offsets, size = [], 0
+        for dtype, shape in layout:
+            offsets.append(size)
+            size += -(-int(np.prod(shape)) * np.dtype(dtype).itemsize // 8) * 8
+
+        if name is None:
+            self._memory = shared_memory.SharedMemory(create=True, size=max(1, size))
+        else:
+            self._memory = shared_memory.SharedMemory(name=name)
+
+        buffer = self._memory.buf
+        self._genotypes, self._criteria, self._objectives, self._fitness, self._evaluated = (
+            np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+            for (dtype, shape), offset in zip(layout, offsets))
+
+    @property
+    # Returns name of shared memory block, other processes attach to population using it
+    def name(self):
+        return self._memory.name
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    def configuration(self):
+        return self._configuration
+
+    @property
+    # Returns reservation indices of classes, one row per chromosome
+    def genotypes(self):
+        return self._genotypes
+
+    @property
+    # Returns flags of class requirements satisfaction, one row per chromosome
+    def criteria(self):
+        return self._criteria
+
+    @property
+    def objectives(self):
+        return self._objectives
+
+    @property
+    def fitness(self):
+        return self._fitness
+
+    @property
+    # Returns flags of rows whose chromosomes have been evaluated
+    def evaluated(self):
+        return self._evaluated
+
+    # Stores chromosome in row of population
+    # Chromosome which has not been evaluated yet, e.g. when evaluation is done in batches, has no objectives
+    def store(self, i, chromosome):
+        self._genotypes[i] = chromosome.genotype()
+        self._evaluated[i] = len(chromosome.objectives) > 0
+        if self._evaluated[i]:
+            self._criteria[i] = chromosome.criteria
+            self._objectives[i] = chromosome.objectives
+            self._fitness[i] = chromosome.fitness
+        else:
+            self._criteria[i], self._objectives[i], self._fitness[i] = False, 0, 0
+
+    # Makes chromosome from row of population, it is left without evaluation when the stored one had none
+    def load(self, prototype, i):
+        chromosome = prototype.makeFromGenotype(self._genotypes[i])
+        if self._evaluated[i]:
+            chromosome.setEvaluation(self._criteria[i], self._objectives[i], self._fitness[i])
+        return chromosome
+
+    # Copies row of another population with the same configuration, chromosome is not made
+    def copy(self, i, population, j):
+        self._genotypes[i], self._evaluated[i] = population.genotypes[j], population.evaluated[j]
+        self._criteria[i], self._objectives[i], self._fitness[i] = (population.criteria[j], population.objectives[j],
+                                                                    population.fitness[j])
+
+    # Returns view of row of population, which can be read without making chromosome
+    def view(self, i):
+        return ScheduleView(self, i)
+
+    # Detaches population from shared memory, arrays cannot be used after that
+    def close(self):
+        self._genotypes = self._criteria = self._objectives = self._fitness = self._evaluated = None
+        self._memory.close()
+
+    # Releases shared memory block, should be called once by process which has created it
+    def unlink(self):
+        self._memory.unlink()
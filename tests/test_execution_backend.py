@@ -0,0 +1,42 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from algorithm.ExecutionBackend import ProcessBackend
+from model.Configuration import Configuration
+from model.Schedule import Schedule
+
+
+def makeConfiguration():
+    configuration = Configuration()
+    configuration.parseFile(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "GaSchedule.json"))
+    return configuration
+
+
+class ProcessBackendTest(unittest.TestCase):
+    # Returns genotypes of population made and changed by genetic operations of backend
+    def runOperations(self, configuration, sharedMemory, seed):
+        np.random.seed(1)
+        backend = ProcessBackend(configuration, maxWorkers=2, sharedMemory=sharedMemory, seed=seed)
+        try:
+            population = backend.initialize(Schedule(configuration), 8)
+            offspring = backend.crossover(list(zip(population[::2], population[1::2])), 2, 80)
+            backend.mutation(offspring, 2, 50)
+            return [chromosome.genotype().tolist() for chromosome in population + offspring]
+        finally:
+            backend.shutdown()
+
+    def testSeededRunIsRepeated(self):
+        configuration = makeConfiguration()
+        for sharedMemory in (False, True):
+            first = self.runOperations(configuration, sharedMemory, 7)
+            self.assertEqual(self.runOperations(configuration, sharedMemory, 7), first)
+            self.assertNotEqual(self.runOperations(configuration, sharedMemory, 8), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,28 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from InstanceGenerator import InstanceGenerator
+from model.Configuration import Configuration
+
+
+class InstanceGeneratorTest(unittest.TestCase):
+    def testEachClassHasSuitableRoom(self):
+        with tempfile.TemporaryDirectory() as directory:
+            fileName = os.path.join(directory, "instance.json")
+            for seed in range(40):
+                # parameters of Benchmark for 100 classes, only one small lab may be made
+                InstanceGenerator(numberOfProfessors=25, numberOfGroups=20, numberOfRooms=6, numberOfLabs=1,
+                                  numberOfClasses=100, seed=seed).write(fileName)
+                configuration = Configuration()
+                configuration.parseFile(fileName)
+                # room is suitable when it has enough seats and computers if they are required
+                suitable = configuration.roomSuitability.all(axis=2).any(axis=1)
+                self.assertTrue(suitable.all(), "seed {}".format(seed))
+
+
+if __name__ == "__main__":
+    unittest.main()
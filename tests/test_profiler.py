@@ -0,0 +1,76 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from algorithm.GeneticAlgorithm import GeneticAlgorithm
+from algorithm.NsgaIII import NsgaIII
+from algorithm.Profiler import NullProfiler, Profiler
+from algorithm.Progress import ProgressObserver
+from model.Configuration import Configuration
+
+
+def makeConfiguration():
+    configuration = Configuration()
+    configuration.parseFile(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "GaSchedule.json"))
+    return configuration
+
+
+# Returns number of measured calls of phase
+def calls(profiler, name):
+    return profiler.toDict()["phases"].get(name, {}).get("calls", 0)
+
+
+class ProfilerTest(unittest.TestCase):
+    def testRunIsMeasuredUntilItStops(self):
+        alg = NsgaIII(makeConfiguration())
+        alg.observer = ProgressObserver()
+        alg.profiler = profiler = Profiler()
+        alg.run(maxRepeat=100, minFitness=0.8)
+
+        measured = calls(profiler, "calculateFitness")
+        self.assertGreater(measured, 0)
+        self.assertGreater(calls(profiler, "replacement"), 0)
+        self.assertTrue(profiler.toDict()["generations"])
+
+        # profiler which does nothing is not attached, so chromosomes of next run are measured only if detach has failed
+        alg.profiler = NullProfiler()
+        alg.run(maxRepeat=100, minFitness=0.8)
+        self.assertEqual(calls(profiler, "calculateFitness"), measured)
+
+    def testProfilersOfOtherAlgorithmsAreIndependent(self):
+        configuration = makeConfiguration()
+        first, second = NsgaIII(configuration), GeneticAlgorithm(configuration)
+        first.profiler, second.profiler = Profiler(), Profiler()
+        first.observer = second.observer = ProgressObserver()
+
+        first.run(maxRepeat=100, minFitness=0.8)
+        measured = first.profiler.toDict()["phases"]
+        second.run(maxRepeat=100, minFitness=0.8)
+
+        self.assertEqual(first.profiler.toDict()["phases"], measured)
+        self.assertGreater(calls(second.profiler, "calculateFitness"), 0)
+
+    def testProfilerIsDetachedWhenRunFails(self):
+        alg = NsgaIII(makeConfiguration())
+        alg.observer = ProgressObserver()
+        alg.profiler = profiler = Profiler()
+
+        def fail(population):
+            raise RuntimeError("replacement failed")
+
+        alg.replacement = fail
+        with self.assertRaises(RuntimeError):
+            alg.run(maxRepeat=100, minFitness=1.0)
+        measured = calls(profiler, "calculateFitness")
+        self.assertGreater(measured, 0)
+
+        del alg.replacement
+        alg.profiler = NullProfiler()
+        alg.run(maxRepeat=100, minFitness=0.8)
+        self.assertEqual(calls(profiler, "calculateFitness"), measured)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from algorithm.ExecutionBackend import ProcessBackend
+from algorithm.NsgaIII import NsgaIII
+from model.Configuration import Configuration
+from model.Schedule import Schedule
+from model.SharedPopulation import SharedPopulation
+
+
+def makeConfiguration():
+    configuration = Configuration()
+    configuration.parseFile(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "GaSchedule.json"))
+    return configuration
+
+
+class SharedPopulationTest(unittest.TestCase):
+    def setUp(self):
+        self.configuration = makeConfiguration()
+        self.prototype = Schedule(self.configuration)
+        self.population = SharedPopulation(self.configuration, 4)
+
+    def tearDown(self):
+        self.population.close()
+        self.population.unlink()
+
+    def testEvaluatedChromosomeIsRestored(self):
+        chromosome = self.prototype.makeNewFromPrototype()
+        self.population.store(0, chromosome)
+        loaded = self.population.load(self.prototype, 0)
+
+        self.assertTrue(self.population.evaluated[0])
+        self.assertEqual(list(loaded.genotype()), list(chromosome.genotype()))
+        self.assertEqual(list(loaded.objectives), list(chromosome.objectives))
+        self.assertEqual(loaded.fitness, chromosome.fitness)
+
+    def testUnevaluatedChromosomeStaysUnevaluated(self):
+        chromosome = self.prototype.makeNewFromPrototype(evaluate=False)
+        self.population.store(1, chromosome)
+        loaded = self.population.load(self.prototype, 1)
+
+        self.assertFalse(self.population.evaluated[1])
+        self.assertEqual(list(loaded.genotype()), list(chromosome.genotype()))
+        self.assertEqual(len(loaded.objectives), 0)
+
+
+    def testViewIsParentOfCrossover(self):
+        father, mother = self.prototype.makeNewFromPrototype(), self.prototype.makeNewFromPrototype()
+        self.population.store(0, father)
+        self.population.store(1, mother)
+        view = self.population.view(0)
+
+        self.assertEqual(view.classes, father.classes)
+        self.assertEqual(list(view.objectives), list(father.objectives))
+        child = self.prototype.makeFromParents(view, self.population.view(1), 2)
+        # each class is taken from one of parents
+        for courseClass, reservation in child.classes.items():
+            self.assertIn(reservation, (father.classes[courseClass], mother.classes[courseClass]))
+
+    def testRowIsCopied(self):
+        chromosome = self.prototype.makeNewFromPrototype()
+        self.population.store(0, chromosome)
+        self.population.copy(2, self.population, 0)
+        loaded = self.population.load(self.prototype, 2)
+
+        self.assertEqual(list(loaded.genotype()), list(chromosome.genotype()))
+        self.assertEqual(loaded.fitness, chromosome.fitness)
+
+
+class SharedMemoryBatchEvaluationTest(unittest.TestCase):
+    def testNsgaIIIRunsWithSharedMemoryAndBatchEvaluation(self):
+        configuration = makeConfiguration()
+        alg = NsgaIII(configuration)
+        alg.backend = backend = ProcessBackend(configuration, maxWorkers=2, sharedMemory=True)
+        alg.run(maxRepeat=100, minFitness=0.8, batchEvaluation=True)
+
+        best = alg.result
+        check = best.copy(best, False)
+        check.calculateFitness()
+        self.assertGreater(best.fitness, 0.8)
+        self.assertAlmostEqual(best.fitness, check.fitness)
+        # shared memory blocks are released when run ends
+        self.assertEqual(len(backend._shared), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()